@@ -2,9 +2,13 @@ import os
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_login import LoginManager
+from db_routing import RoutingSession, REPLICA_BIND, get_engine_options, init_db_routing
+from sites import init_sites, registry
+from fragment_cache import FragmentCacheExtension
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -12,18 +16,60 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 
 # Create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
 # Configure the database
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = get_engine_options()
+
+# Optional read replica: public GET pages read from it, everything else uses the primary
+if os.environ.get("DATABASE_REPLICA_URL"):
+    app.config["SQLALCHEMY_BINDS"] = {
+        REPLICA_BIND: {"url": os.environ["DATABASE_REPLICA_URL"], **get_engine_options()},
+    }
+# Seconds a session that wrote something keeps reading from the primary
+app.config["REPLICA_LAG_WINDOW"] = int(os.environ.get("REPLICA_LAG_WINDOW", "30"))
+
+# /readyz caches its result and gives up on a database ping after this many seconds
+app.config["READINESS_CACHE_TTL"] = float(os.environ.get("READINESS_CACHE_TTL", "5"))
+app.config["READINESS_DB_TIMEOUT"] = float(os.environ.get("READINESS_DB_TIMEOUT", "2"))
+
+# Contact submission retention: read submissions older than this are archived to compressed JSONL
+app.config["CONTACT_RETENTION_DAYS"] = int(os.environ.get("CONTACT_RETENTION_DAYS", "180"))
+app.config["CONTACT_RETENTION_BATCH_SIZE"] = int(os.environ.get("CONTACT_RETENTION_BATCH_SIZE", "500"))
+app.config["CONTACT_ARCHIVE_DIR"] = os.environ.get("CONTACT_ARCHIVE_DIR", os.path.join(app.instance_path, "contact_archive"))
+
+# Media link checker: parallel HEAD requests with a per-host cap, results reused for LINK_CHECK_TTL seconds
+app.config["LINK_CHECK_TIMEOUT"] = float(os.environ.get("LINK_CHECK_TIMEOUT", "5"))
+app.config["LINK_CHECK_MAX_WORKERS"] = int(os.environ.get("LINK_CHECK_MAX_WORKERS", "16"))
+app.config["LINK_CHECK_PER_HOST"] = int(os.environ.get("LINK_CHECK_PER_HOST", "4"))
+app.config["LINK_CHECK_TTL"] = int(os.environ.get("LINK_CHECK_TTL", "21600"))
+app.config["LINK_CHECK_AUTO_DEACTIVATE"] = os.environ.get("LINK_CHECK_AUTO_DEACTIVATE", "false").lower() == "true"
+
+# Multi-site: JSON map of site key -> {"hosts": [...], "url": "..."}; unset means a single site
+app.config["SITES"] = os.environ.get("SITES")
+app.config["SITE_CACHE_TTL"] = int(os.environ.get("SITE_CACHE_TTL", "60"))
+
+# Static export: frozen public pages are written here and refreshed on admin saves
+app.config["STATIC_EXPORT_DIR"] = os.environ.get("STATIC_EXPORT_DIR")
+app.config["SITE_URL"] = os.environ.get("SITE_URL", "http://localhost/")
+
+# Seconds a logged-in admin's identity is trusted from the session before re-checking the database;
+# set-admin-password touches ADMIN_REVOCATION_FILE so every worker sharing it re-checks at once
+app.config["ADMIN_IDENTITY_TTL"] = int(os.environ.get("ADMIN_IDENTITY_TTL", "30"))
+app.config["ADMIN_REVOCATION_FILE"] = os.environ.get("ADMIN_REVOCATION_FILE", os.path.join(app.instance_path, "admin_revoked"))
+
+# Rate limits for abuse-prone POST endpoints: (scope, rate) where scope is 'ip' or 'form:<field>'
+app.config["RATE_LIMIT_ENABLED"] = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() != "false"
+app.config["RATE_LIMIT_BACKEND"] = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # 'memory' or 'database'
+app.config["RATE_LIMITS"] = {
+    'admin_login': [('ip', '10/minute'), ('form:username', '5/5minutes')],
+    'contact': [('ip', '3/10minutes'), ('form:email', '5/hour')],
 }
 
 # Configure Flask-Login
@@ -35,23 +81,112 @@ login_manager.login_message_category = 'info'
 
 # Initialize the app with the extension
 db.init_app(app)
+init_db_routing(app)
+init_sites(app)
+app.jinja_env.add_extension(FragmentCacheExtension)
+
+def add_missing_columns():
+    """Add columns and indexes introduced after a table was created (create_all skips existing tables)
+
+    New columns must be nullable or carry a server default.
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}' NOT NULL"
+                db.session.execute(text(ddl))
+                logging.info(f"Added column {table.name}.{column.name}")
+        db.session.commit()
+        
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+                logging.info(f"Added index {index.name}")
+
+def rebuild_sqlite_table(table):
+    """Recreate a table from its model and copy the rows across (SQLite can't drop a constraint)
+
+    The old table is renamed out of the way first so the new one and its
+    indexes get their usual names. None of these tables has foreign keys.
+    """
+    inspector = db.inspect(db.engine)
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    columns = ', '.join(column.name for column in table.columns if column.name in existing)
+    indexes = [index['name'] for index in inspector.get_indexes(table.name)]
+    old_name = f'{table.name}__old'
+    with db.engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {old_name}'))
+        for index_name in indexes:
+            conn.execute(text(f'DROP INDEX {index_name}'))
+        table.create(bind=conn)
+        conn.execute(text(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name}'))
+        conn.execute(text(f'DROP TABLE {old_name}'))
+    logging.info(f"Rebuilt {table.name} with site-scoped unique constraints")
+
+def upgrade_unique_constraints():
+    """Replace unique constraints that predate multi-site support with their site-scoped versions"""
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        wanted = [constraint for constraint in table.constraints if isinstance(constraint, db.UniqueConstraint)]
+        wanted_columns = [{column.name for column in constraint.columns} for constraint in wanted]
+        existing = inspector.get_unique_constraints(table.name)
+        existing_columns = [set(constraint['column_names']) for constraint in existing]
+        outdated = [constraint for constraint in existing
+                    if set(constraint['column_names']) not in wanted_columns
+                    and 'site_key' not in constraint['column_names']]
+        if db.engine.dialect.name == 'sqlite':
+            if outdated:
+                rebuild_sqlite_table(table)
+            continue
+        for constraint in outdated:
+            if not constraint['name']:
+                raise RuntimeError(f"{table.name} has an unnamed unique({', '.join(constraint['column_names'])}) "
+                                   f"that must be dropped by hand before enabling multi-site mode")
+            db.session.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT {constraint["name"]}'))
+            logging.info(f"Dropped unique constraint {constraint['name']}")
+        for constraint, columns in zip(wanted, wanted_columns):
+            if columns not in existing_columns:
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD UNIQUE ({", ".join(c.name for c in constraint.columns)})'))
+                logging.info(f"Added unique({', '.join(sorted(columns))}) on {table.name}")
+    db.session.commit()
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models import Admin
-    return Admin.query.get(int(user_id))
+    from auth_utils import load_admin
+    return load_admin(user_id)
 
 with app.app_context():
     # Make sure to import the models here or their tables won't be created
     import models  # noqa: F401
     db.create_all()
+    add_missing_columns()
+    if registry.is_multi_site:
+        upgrade_unique_constraints()
+    
+    # Schema is checked once per worker here; /readyz reports the stored result
+    from health import verify_schema
+    verify_schema()
     
     # Create default admin user if none exists
     from models import Admin, SiteSettings, PageContent
     from werkzeug.security import generate_password_hash
+    from html_utils import render_content_html
     
-    if not Admin.query.first():
+    # Admins belong to one site; only the first site gets the default account,
+    # other sites get theirs from `flask create-admin --site <key>`
+    if not Admin.query.filter_by(site_key=registry.default_key).first():
         admin = Admin(
+            site_key=registry.default_key,
             username='admin',
             email='admin@grandstageprod.com',
             password_hash=generate_password_hash('admin123')
@@ -60,55 +195,68 @@ with app.app_context():
         db.session.commit()
         logging.info("Default admin user created: admin/admin123")
     
-    # Create default site settings if none exist
-    if not SiteSettings.query.first():
-        settings = SiteSettings(
-            site_title='Grand Stage Productions',
-            site_slogan='Bringing Stories to Life',
-            logo_url='/static/images/default-logo.svg',
-            contact_email='info@grandstageprod.com',
-            contact_phone='(555) 123-4567',
-            instagram_url='https://instagram.com/grandstageprod',
-            facebook_url='https://facebook.com/grandstageprod',
-            twitter_url='https://twitter.com/grandstageprod',
-            whatsapp_url='https://wa.me/15551234567'
-        )
-        db.session.add(settings)
-        db.session.commit()
-        logging.info("Default site settings created")
-    
-    # Create default page content if none exists
-    pages = ['home', 'about', 'gallery', 'contact']
-    for page_name in pages:
-        if not PageContent.query.filter_by(page_name=page_name).first():
-            if page_name == 'home':
-                content = """
-                <div class="hero-section text-center py-5">
-                    <h1 class="display-4 text-theatrical mb-4">Welcome to Grand Stage Productions</h1>
-                    <p class="lead">Where every performance tells a story, and every story comes to life on stage.</p>
-                    <p>Grand Stage Productions is dedicated to bringing the magic of theater to our community. From classic dramas to contemporary comedies, we create unforgettable experiences that transport audiences to different worlds.</p>
-                </div>
-                """
-            elif page_name == 'about':
-                content = """
-                <h2 class="text-theatrical mb-4">About Grand Stage Productions</h2>
-                <p>Founded with a passion for storytelling, Grand Stage Productions has been entertaining audiences with high-quality theatrical performances. Our company brings together talented actors, directors, and crew members who share a common love for the arts.</p>
-                <p>We believe in the power of live theater to connect people, inspire emotions, and create lasting memories. Every production we stage is carefully crafted to deliver an exceptional experience for our audience.</p>
-                """
-            elif page_name == 'contact':
-                content = """
-                <h2 class="text-theatrical mb-4">Contact Us</h2>
-                <p>Get in touch with Grand Stage Productions for booking inquiries, audition information, or general questions about our upcoming performances.</p>
-                <p>We'd love to hear from you and discuss how we can bring our theatrical magic to your venue or event.</p>
-                """
+    # Create default site settings and page content for every configured site
+    for site_key in registry.keys():
+        is_original_site = site_key == registry.default_key
+        
+        if not is_original_site and not Admin.query.filter_by(site_key=site_key).first():
+            logging.warning(f"Site {site_key} has no admin yet; create one with "
+                            f"`flask --app main create-admin --site {site_key} <username> <email>`")
+        
+        if not SiteSettings.query.filter_by(site_key=site_key).first():
+            if is_original_site:
+                settings = SiteSettings(
+                    site_key=site_key,
+                    site_title='Grand Stage Productions',
+                    site_slogan='Bringing Stories to Life',
+                    logo_url='/static/images/default-logo.svg',
+                    contact_email='info@grandstageprod.com',
+                    contact_phone='(555) 123-4567',
+                    instagram_url='https://instagram.com/grandstageprod',
+                    facebook_url='https://facebook.com/grandstageprod',
+                    twitter_url='https://twitter.com/grandstageprod',
+                    whatsapp_url='https://wa.me/15551234567'
+                )
             else:
-                content = f"<h2 class='text-theatrical mb-4'>{page_name.title()}</h2><p>Content for the {page_name} page.</p>"
-            
-            page_content = PageContent(
-                page_name=page_name,
-                content=content
-            )
-            db.session.add(page_content)
+                settings = SiteSettings(site_key=site_key, site_title=site_key.replace('-', ' ').title())
+            db.session.add(settings)
+            db.session.commit()
+            logging.info(f"Default site settings created for {site_key}")
         
-    db.session.commit()
+        # Create default page content if none exists
+        pages = ['home', 'about', 'gallery', 'contact']
+        for page_name in pages:
+            if not PageContent.query.filter_by(site_key=site_key, page_name=page_name).first():
+                if page_name == 'home' and is_original_site:
+                    content = """
+                    <div class="hero-section text-center py-5">
+                        <h1 class="display-4 text-theatrical mb-4">Welcome to Grand Stage Productions</h1>
+                        <p class="lead">Where every performance tells a story, and every story comes to life on stage.</p>
+                        <p>Grand Stage Productions is dedicated to bringing the magic of theater to our community. From classic dramas to contemporary comedies, we create unforgettable experiences that transport audiences to different worlds.</p>
+                    </div>
+                    """
+                elif page_name == 'about' and is_original_site:
+                    content = """
+                    <h2 class="text-theatrical mb-4">About Grand Stage Productions</h2>
+                    <p>Founded with a passion for storytelling, Grand Stage Productions has been entertaining audiences with high-quality theatrical performances. Our company brings together talented actors, directors, and crew members who share a common love for the arts.</p>
+                    <p>We believe in the power of live theater to connect people, inspire emotions, and create lasting memories. Every production we stage is carefully crafted to deliver an exceptional experience for our audience.</p>
+                    """
+                elif page_name == 'contact' and is_original_site:
+                    content = """
+                    <h2 class="text-theatrical mb-4">Contact Us</h2>
+                    <p>Get in touch with Grand Stage Productions for booking inquiries, audition information, or general questions about our upcoming performances.</p>
+                    <p>We'd love to hear from you and discuss how we can bring our theatrical magic to your venue or event.</p>
+                    """
+                else:
+                    content = f"<h2 class='text-theatrical mb-4'>{page_name.title()}</h2><p>Content for the {page_name} page.</p>"
+                
+                page_content = PageContent(
+                    site_key=site_key,
+                    page_name=page_name,
+                    content=content,
+                    content_html=render_content_html(content)
+                )
+                db.session.add(page_content)
+            
+        db.session.commit()
     logging.info("Default page content created")
@@ -0,0 +1,148 @@
+import os
+import hmac
+import time
+import hashlib
+import click
+from flask import session
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash
+from app import app, db
+from models import Admin
+from sites import current_site_key, registry
+
+# Session key holding the cached identity of the logged-in admin
+IDENTITY_SESSION_KEY = '_admin_identity'
+
+class SessionAdmin(UserMixin):
+    """Stand-in for Admin built from the session, used between database checks
+
+    id, username and site_key come from the session; any other Admin attribute
+    (email, created_at, ...) loads the row on first use, so current_user
+    behaves like an Admin either way.
+    """
+
+    def __init__(self, admin_id, username, site_key):
+        self.id = admin_id
+        self.username = username
+        self.site_key = site_key
+        self._admin = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._admin is None:
+            self._admin = db.session.get(Admin, self.id)
+            if self._admin is None:
+                raise AttributeError(name)
+        return getattr(self._admin, name)
+
+    def __repr__(self):
+        return f'<SessionAdmin {self.username}>'
+
+def password_fingerprint(password_hash):
+    """Keyed digest of the stored password hash; changes whenever the password does"""
+    key = (app.secret_key or '').encode('utf-8')
+    return hmac.new(key, password_hash.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+def revoke_identities():
+    """Make every worker on this host re-check cached admin identities on their next request"""
+    path = app.config['ADMIN_REVOCATION_FILE']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a'):
+        pass
+    os.utime(path)
+
+def revoked_since(checked_at):
+    """True when identities were revoked after checked_at (one stat, no database)"""
+    try:
+        return os.stat(app.config['ADMIN_REVOCATION_FILE']).st_mtime >= checked_at
+    except FileNotFoundError:
+        return False
+
+def remember_identity(admin):
+    """Cache the admin's identity in the session until the TTL runs out"""
+    now = time.time()
+    session[IDENTITY_SESSION_KEY] = {
+        'id': admin.id,
+        'username': admin.username,
+        'site_key': admin.site_key,
+        'fingerprint': password_fingerprint(admin.password_hash),
+        'checked': now,
+        'expires': int(now) + app.config['ADMIN_IDENTITY_TTL'],
+    }
+
+def forget_identity():
+    session.pop(IDENTITY_SESSION_KEY, None)
+
+def load_admin(user_id):
+    """Resolve the logged-in admin, hitting the database only once per TTL
+
+    When the cached identity expires, or set-admin-password has revoked
+    identities since it was cached, the admin row is re-read and the password
+    fingerprint compared, so a deleted admin or changed password ends the
+    session at the next check. An admin is only ever signed in on their own site.
+    """
+    user_id = int(user_id)
+    site_key = current_site_key()
+    identity = session.get(IDENTITY_SESSION_KEY)
+    if (identity and identity.get('id') == user_id and identity.get('site_key') == site_key
+            and identity.get('expires', 0) > time.time() and not revoked_since(identity.get('checked', 0))):
+        return SessionAdmin(identity['id'], identity['username'], identity['site_key'])
+
+    admin = db.session.get(Admin, user_id)
+    if admin is not None and admin.site_key != site_key:
+        # Another site's admin (e.g. a cookie shared across subdomains): anonymous here
+        return None
+    if admin is None or (identity and identity.get('id') == user_id and
+                         not hmac.compare_digest(identity.get('fingerprint', ''),
+                                                 password_fingerprint(admin.password_hash))):
+        forget_identity()
+        return None
+    remember_identity(admin)
+    return admin
+
+@app.cli.command('create-admin')
+@click.argument('username')
+@click.argument('email')
+@click.option('--site', 'site_key', default=None, help='Site key the admin belongs to (defaults to the first site).')
+@click.password_option()
+def create_admin_command(username, email, site_key, password):
+    """Create an admin account for one site."""
+    site_key = site_key or registry.default_key
+    if site_key not in registry.keys():
+        raise click.UsageError(f"Unknown site {site_key}")
+    if Admin.query.filter_by(site_key=site_key, username=username).first():
+        raise click.UsageError(f"{site_key} already has an admin named {username}")
+    db.session.add(Admin(site_key=site_key, username=username, email=email,
+                         password_hash=generate_password_hash(password)))
+    db.session.commit()
+    click.echo(f"Admin {username} created for {site_key}.")
+
+@app.cli.command('set-admin-password')
+@click.argument('username')
+@click.option('--site', 'site_key', default=None, help='Site key the admin belongs to (defaults to the first site).')
+@click.password_option()
+def set_admin_password_command(username, site_key, password):
+    """Change an admin's password and sign out their existing sessions."""
+    site_key = site_key or registry.default_key
+    admin = Admin.query.filter_by(site_key=site_key, username=username).first()
+    if not admin:
+        raise click.UsageError(f"No admin named {username} on {site_key}")
+    admin.password_hash = generate_password_hash(password)
+    db.session.commit()
+    revoke_identities()
+    click.echo(f"Password updated for {username}. Open sessions are signed out on their next request.")
+
+@app.cli.command('delete-admin')
+@click.argument('username')
+@click.option('--site', 'site_key', default=None, help='Site key the admin belongs to (defaults to the first site).')
+def delete_admin_command(username, site_key):
+    """Delete an admin account and sign out their existing sessions."""
+    site_key = site_key or registry.default_key
+    admin = Admin.query.filter_by(site_key=site_key, username=username).first()
+    if not admin:
+        raise click.UsageError(f"No admin named {username} on {site_key}")
+    db.session.delete(admin)
+    db.session.commit()
+    revoke_identities()
+    click.echo(f"Admin {username} deleted from {site_key}.")
@@ -0,0 +1,77 @@
+import os
+import time
+from flask import g, request, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+
+# Bind key used for the read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+# Engine option presets, picked with DB_POOL_PROFILE
+POOL_PROFILES = {
+    # Original settings: small default pool, validated on every checkout
+    'default': {'pool_recycle': 300, 'pool_pre_ping': True},
+    # One or two low-traffic workers
+    'small': {'pool_size': 2, 'max_overflow': 2, 'pool_timeout': 10, 'pool_recycle': 300, 'pool_pre_ping': False},
+    # Busier deployments with several threads per worker
+    'web': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 1800, 'pool_pre_ping': False},
+    # An external pooler (e.g. PgBouncer) already holds the connections
+    'pgbouncer': {'poolclass': NullPool},
+}
+
+# Environment variables that override a single option of the chosen profile
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', int),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', lambda value: value.lower() in ('1', 'true', 'yes')),
+}
+
+def get_engine_options(environ=os.environ):
+    """Engine options for the DB_POOL_PROFILE profile plus any DB_* overrides"""
+    profile = environ.get('DB_POOL_PROFILE', 'default')
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE {profile!r}; choose from {', '.join(POOL_PROFILES)}")
+    options = dict(POOL_PROFILES[profile])
+    for name, (option, convert) in POOL_OVERRIDES.items():
+        if environ.get(name):
+            options[option] = convert(environ[name])
+    return options
+
+class RoutingSession(Session):
+    """Session that sends plain reads to the replica when the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context() and g.get('use_replica')
+                and getattr(clause, 'is_select', False)):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_write(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+def init_db_routing(app):
+    """Choose primary or replica per request and keep writers on the primary for a while"""
+
+    @app.before_request
+    def choose_database():
+        g.use_replica = (
+            REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {})
+            and request.method in ('GET', 'HEAD')
+            and not request.path.startswith('/admin')
+            # Read-your-writes: admins, and anyone who just wrote, stay on the primary
+            and '_user_id' not in session
+            and session.get('_primary_until', 0) < time.time()
+        )
+
+    @app.after_request
+    def remember_write(response):
+        if g.get('db_wrote'):
+            session['_primary_until'] = int(time.time()) + app.config['REPLICA_LAG_WINDOW']
+        return response
@@ -2,15 +2,27 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from models import EmailCredentials
+from datetime import datetime
 from app import db
+from sites import current_site_key, site_query
 
-def get_email_credentials():
-    """Get the current email credentials from database"""
-    return EmailCredentials.query.first()
+# Outcome of the most recent send per site in this worker, reported by the readiness check
+last_send_status = {}
 
-def send_email(to_email, subject, html_content, text_content=None):
-    """Send an email using stored credentials"""
-    credentials = get_email_credentials()
+def get_send_status(site_key):
+    return dict(last_send_status.get(site_key, {'ok': None, 'at': None, 'error': None}))
+
+def record_send_status(site_key, ok, error=None):
+    last_send_status[site_key] = {'ok': ok, 'at': datetime.utcnow().isoformat(timespec='seconds') + 'Z', 'error': error}
+
+def get_email_credentials(site_key=None):
+    """Get the email credentials of a site (the current one by default) from database"""
+    return site_query(EmailCredentials, site_key).first()
+
+def send_email(to_email, subject, html_content, text_content=None, site_key=None):
+    """Send an email using the site's stored credentials"""
+    site_key = site_key or current_site_key()
+    credentials = get_email_credentials(site_key)
     
     if not credentials:
         return False, "No email credentials configured"
@@ -42,14 +54,16 @@ def send_email(to_email, subject, html_content, text_content=None):
         server.sendmail(credentials.email_address, to_email, text)
         server.quit()
         
+        record_send_status(site_key, True)
         return True, "Email sent successfully"
         
     except Exception as e:
+        record_send_status(site_key, False, str(e))
         return False, f"Failed to send email: {str(e)}"
 
 def send_contact_notification(submission):
     """Send notification emails for contact form submission"""
-    credentials = get_email_credentials()
+    credentials = get_email_credentials(submission.site_key)
     if not credentials:
         return False, "No email credentials configured"
     
@@ -134,7 +148,9 @@ def send_contact_notification(submission):
     """
     
     # Send both emails
-    success_user, msg_user = send_email(submission.email, thank_you_subject, thank_you_html, thank_you_text)
-    success_admin, msg_admin = send_email(credentials.email_address, internal_subject, internal_html)
+    success_user, msg_user = send_email(submission.email, thank_you_subject, thank_you_html, thank_you_text,
+                                        site_key=submission.site_key)
+    success_admin, msg_admin = send_email(credentials.email_address, internal_subject, internal_html,
+                                          site_key=submission.site_key)
     
     return success_user and success_admin, f"User email: {msg_user}, Admin email: {msg_admin}"
\ No newline at end of file
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+class FragmentCache:
+    """Bounded LRU of rendered template fragments, local to one worker"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class FragmentCacheExtension(Extension):
+    """{% cache "name", extra, key, parts %}...{% endcache %}
+
+    Renders the block once per cache version and key, then reuses the output.
+    The version comes from environment.fragment_cache_version(); when it
+    returns None the block is rendered normally. Only put markup in a cached
+    block that depends on nothing but the version and the listed key parts.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(
+            fragment_cache=FragmentCache(),
+            fragment_cache_version=lambda: None,
+        )
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render_cached', [nodes.List(key_parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key_parts, caller):
+        version = self.environment.fragment_cache_version()
+        if version is None:
+            return caller()
+        key = (version, *key_parts)
+        cached = self.environment.fragment_cache.get(key)
+        if cached is None:
+            cached = caller()
+            self.environment.fragment_cache.set(key, cached)
+        return cached
@@ -0,0 +1,90 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from app import app, db
+from models import EmailCredentials
+from email_utils import get_send_status
+from sites import current_site_key
+
+# Filled once per worker at startup by verify_schema()
+schema_status = {'ok': False, 'missing_tables': [], 'checked_at': None}
+
+# Last readiness result, shared by every request in this worker until it expires
+_cache = {'result': None, 'expires': 0}
+_cache_lock = threading.Lock()
+_ping_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-ping')
+_ping_in_flight = None
+
+def verify_schema():
+    """Compare the database tables against the models; run once at startup"""
+    try:
+        existing = set(db.inspect(db.engine).get_table_names())
+        missing = sorted(table.name for table in db.metadata.sorted_tables if table.name not in existing)
+        schema_status.update(ok=not missing, missing_tables=missing)
+    except Exception as e:
+        logging.error(f"Schema check failed: {e}")
+        schema_status.update(ok=False, missing_tables=[])
+    schema_status['checked_at'] = int(time.time())
+
+def ping_databases(engines):
+    """SELECT 1 against each engine and list the sites with email credentials on the primary"""
+    checks = {}
+    for name, engine in engines.items():
+        with engine.connect() as conn:
+            conn.execute(db.text('SELECT 1'))
+            if name == 'primary':
+                checks['email_sites'] = set(conn.execute(
+                    db.select(EmailCredentials.__table__.c.site_key).distinct()).scalars())
+        checks[name] = True
+    return checks
+
+def run_readiness_checks():
+    global _ping_in_flight
+    engines = {'primary': db.engines[None]}
+    for key, engine in db.engines.items():
+        if key is not None:
+            engines[key] = engine
+
+    # A ping stuck on a dead database must not pile up new threads behind it
+    if _ping_in_flight is None or _ping_in_flight.done():
+        _ping_in_flight = _ping_executor.submit(ping_databases, engines)
+    try:
+        checks = _ping_in_flight.result(timeout=app.config['READINESS_DB_TIMEOUT'])
+        database = {'ok': True, **{name: checks[name] for name in engines}}
+        email_sites = checks['email_sites']
+    except TimeoutError:
+        database = {'ok': False, 'error': 'timeout'}
+        email_sites = None
+    except Exception as e:
+        database = {'ok': False, 'error': str(e)}
+        email_sites = None
+
+    return {
+        'ready': database['ok'] and schema_status['ok'],
+        'database': database,
+        'schema': dict(schema_status),
+        'email_sites': email_sites,
+        'checked_at': int(time.time()),
+    }
+
+def get_cached_checks():
+    """Raw check results, recomputed at most once per READINESS_CACHE_TTL seconds"""
+    now = time.time()
+    if _cache['result'] is not None and _cache['expires'] > now:
+        return _cache['result']
+    with _cache_lock:
+        # Another request may have refreshed it while we waited
+        if _cache['result'] is None or _cache['expires'] <= time.time():
+            _cache['result'] = run_readiness_checks()
+            _cache['expires'] = time.time() + app.config['READINESS_CACHE_TTL']
+        return _cache['result']
+
+def get_readiness():
+    """Readiness report for the current site; email status covers only that site's credentials"""
+    checks = dict(get_cached_checks())
+    email_sites = checks.pop('email_sites')
+    site_key = current_site_key()
+    configured = None if email_sites is None else site_key in email_sites
+    checks['email'] = {'configured': configured, 'last_send': get_send_status(site_key)}
+    return checks
@@ -0,0 +1,152 @@
+import re
+import click
+from html import escape
+from html.parser import HTMLParser
+from app import app, db
+
+# Tags admins may use in page content; anything else is dropped but its text is kept
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre',
+    'section', 'small', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th',
+    'thead', 'tr', 'u', 'ul',
+}
+
+# Tags whose contents are removed along with the tag itself
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript'}
+
+VOID_TAGS = {'br', 'hr', 'img'}
+
+GLOBAL_ATTRIBUTES = {'class', 'id', 'title'}
+TAG_ATTRIBUTES = {
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height', 'loading'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_URL_SCHEMES = {'http', 'https', 'mailto', 'tel'}
+
+# Whitespace between these tags is never rendered, so it can be dropped entirely
+BLOCK_TAGS = {
+    'blockquote', 'div', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'li', 'ol', 'p', 'section', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+}
+
+# Only HTML's own whitespace: \s would also eat the non-breaking spaces &nbsp; decodes to
+HTML_WHITESPACE = ' \t\n\r\f'
+WHITESPACE_RE = re.compile(f'[{HTML_WHITESPACE}]+')
+SCHEME_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):')
+
+def is_safe_url(url):
+    """Allow relative URLs and an explicit list of schemes (no javascript:, data:, ...)"""
+    # Browsers ignore control characters and whitespace inside the scheme
+    compact = re.sub(r'[\x00-\x20]+', '', url)
+    match = SCHEME_RE.match(compact)
+    return not match or match.group(1).lower() in ALLOWED_URL_SCHEMES
+
+class ContentSanitizer(HTMLParser):
+    """Rebuilds admin HTML keeping only allowlisted markup, with whitespace collapsed"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.drop_depth = 0
+        self.pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth or tag not in ALLOWED_TAGS:
+            return
+
+        allowed = GLOBAL_ATTRIBUTES | TAG_ATTRIBUTES.get(tag, set())
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            value = WHITESPACE_RE.sub(' ', value or '').strip(HTML_WHITESPACE)
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            rendered.append(f' {name}="{escape(value)}"')
+        if tag == 'a' and any(name == 'target' for name, _ in attrs):
+            # Links opening a new tab must not get a handle on this window
+            rendered = [attr for attr in rendered if not attr.startswith(' rel=')]
+            rendered.append(' rel="noopener noreferrer"')
+
+        self.parts.append(f"<{tag}{''.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+            if tag == 'pre':
+                self.pre_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth -= 1
+        elif tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays well formed
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            if open_tag == 'pre':
+                self.pre_depth -= 1
+            self.parts.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        if not self.pre_depth:
+            data = WHITESPACE_RE.sub(' ', data)
+        self.parts.append(escape(data, quote=False))
+
+    def get_html(self):
+        while self.open_tags:
+            self.parts.append(f"</{self.open_tags.pop()}>")
+        return minify_block_whitespace(''.join(self.parts))
+
+BLOCK_BOUNDARY_RE = re.compile(
+    r'[%s]*(</?(?:%s)\b[^>]*>)[%s]*' % (HTML_WHITESPACE, '|'.join(sorted(BLOCK_TAGS)), HTML_WHITESPACE))
+
+def minify_block_whitespace(html):
+    """Drop the whitespace left around block-level tags after collapsing"""
+    if '<pre' in html:
+        # Keep preformatted blocks byte for byte
+        chunks = re.split(r'(<pre\b.*?</pre>)', html, flags=re.S)
+        return ''.join(chunk if chunk.startswith('<pre') else BLOCK_BOUNDARY_RE.sub(r'\1', chunk)
+                       for chunk in chunks).strip(HTML_WHITESPACE)
+    return BLOCK_BOUNDARY_RE.sub(r'\1', html).strip(HTML_WHITESPACE)
+
+def render_content_html(source):
+    """Sanitize and minify admin-entered HTML for public rendering"""
+    sanitizer = ContentSanitizer()
+    sanitizer.feed(source or '')
+    sanitizer.close()
+    return sanitizer.get_html()
+
+@app.cli.command('backfill-content-html')
+@click.option('--all', 'process_all', is_flag=True, help='Re-render every page, not just rows missing output.')
+def backfill_content_html_command(process_all):
+    """Fill PageContent.content_html for existing rows."""
+    from models import PageContent
+
+    query = PageContent.query
+    if not process_all:
+        query = query.filter(PageContent.content_html.is_(None))
+    pages = query.all()
+    for page in pages:
+        page.content_html = render_content_html(page.content)
+        click.echo(f"Rendered {page.page_name}: {len(page.content)} -> {len(page.content_html)} bytes")
+    db.session.commit()
+    click.echo(f"Updated {len(pages)} page(s)")
@@ -0,0 +1,201 @@
+import time
+import socket
+import logging
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import click
+from app import app, db
+from models import Image, Video
+from sites import site_query
+from static_export import regenerate_pages
+
+USER_AGENT = 'GrandStageLinkChecker/1.0'
+
+# Results per URL within this worker: url -> (expires_at, (status, detail))
+_result_cache = {}
+_result_cache_lock = threading.Lock()
+
+# Sites with a background check running in this worker
+_running_sites = set()
+_running_lock = threading.Lock()
+
+class HostLimiter:
+    """Caps how many requests run against one host at the same time"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlsplit(url).hostname or ''
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self.semaphores[host]
+
+def classify_status(code):
+    """'ok', 'broken' (gone for good) or 'error' (might be temporary, never auto-deactivated)"""
+    if code < 400:
+        return 'ok'
+    if code in (404, 410):
+        return 'broken'
+    return 'error'
+
+def open_url(url, method, timeout):
+    headers = {'User-Agent': USER_AGENT}
+    if method == 'GET':
+        # Only the status matters, so ask for as little of the body as possible
+        headers['Range'] = 'bytes=0-0'
+    request = urllib.request.Request(url, method=method, headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+def check_url(url, timeout):
+    """HEAD the URL (GET when HEAD is refused) and return (status, detail)
+
+    Only a 404 or 410 counts as broken. DNS failures, refused connections and
+    timeouts are often temporary, so they are errors and never deactivate media.
+    """
+    if urlsplit(url).scheme not in ('http', 'https'):
+        return 'error', 'unsupported URL scheme'
+    try:
+        try:
+            code = open_url(url, 'HEAD', timeout)
+        except urllib.error.HTTPError as e:
+            if e.code not in (403, 405, 501):
+                raise
+            code = open_url(url, 'GET', timeout)
+        return classify_status(code), f'HTTP {code}'
+    except urllib.error.HTTPError as e:
+        return classify_status(e.code), f'HTTP {e.code}'
+    except urllib.error.URLError as e:
+        return 'error', str(e.reason)
+    except (socket.timeout, TimeoutError):
+        return 'error', 'timed out'
+    except Exception as e:
+        return 'error', str(e)
+
+def check_urls(urls, timeout=None, max_workers=None, per_host=None, ttl=None):
+    """Check many URLs in parallel with a bounded pool and a per-host cap
+
+    Returns {url: (status, detail)}; results younger than ttl seconds come
+    from this worker's cache instead of the network.
+    """
+    timeout = timeout or app.config['LINK_CHECK_TIMEOUT']
+    max_workers = max_workers or app.config['LINK_CHECK_MAX_WORKERS']
+    per_host = per_host or app.config['LINK_CHECK_PER_HOST']
+    ttl = app.config['LINK_CHECK_TTL'] if ttl is None else ttl
+
+    now = time.time()
+    results = {}
+    pending = []
+    with _result_cache_lock:
+        for url in dict.fromkeys(urls):
+            cached = _result_cache.get(url)
+            if cached and cached[0] > now:
+                results[url] = cached[1]
+            else:
+                pending.append(url)
+
+    limiter = HostLimiter(per_host)
+
+    def run(url):
+        with limiter.for_url(url):
+            return url, check_url(url, timeout)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            for url, result in executor.map(run, pending):
+                results[url] = result
+        expires = time.time() + ttl
+        with _result_cache_lock:
+            for url in pending:
+                _result_cache[url] = (expires, results[url])
+    return results
+
+def check_media(force=False, deactivate=None, site_key=None):
+    """Check active image and video URLs not checked within the TTL and store the results
+
+    Only site_key's media is checked when given, every site's otherwise (CLI).
+    Returns a summary dict of counts. Broken items are deactivated when
+    deactivate (or LINK_CHECK_AUTO_DEACTIVATE) is set.
+    """
+    deactivate = app.config['LINK_CHECK_AUTO_DEACTIVATE'] if deactivate is None else deactivate
+    ttl = 0 if force else app.config['LINK_CHECK_TTL']
+    stale_before = datetime.utcnow() - timedelta(seconds=ttl)
+
+    targets = []
+    for model, url_field in ((Image, 'image_url'), (Video, 'video_url')):
+        query = site_query(model, site_key) if site_key else model.query
+        query = query.filter(model.is_active.is_(True))
+        if not force:
+            query = query.filter(db.or_(model.link_checked_at.is_(None), model.link_checked_at < stale_before))
+        targets.extend((model, url_field, item.id, getattr(item, url_field)) for item in query.all())
+    # End the read transaction so the connection isn't left idle in a transaction
+    # for the whole (network-bound) check
+    db.session.rollback()
+
+    results = check_urls([url for _, _, _, url in targets], ttl=ttl)
+    summary = {'checked': 0, 'ok': 0, 'broken': 0, 'error': 0, 'deactivated': 0}
+    affected_pages = []
+    checked_at = datetime.utcnow()
+    for model, url_field, item_id, url in targets:
+        item = db.session.get(model, item_id)
+        if item is None or getattr(item, url_field) != url:
+            # Deleted or edited while the check ran; the next run picks it up
+            continue
+        status, detail = results[url]
+        item.link_status = status
+        item.link_error = None if status == 'ok' else detail[:200]
+        item.link_checked_at = checked_at
+        summary['checked'] += 1
+        summary[status] += 1
+        if status == 'broken' and deactivate:
+            item.is_active = False
+            summary['deactivated'] += 1
+            affected_pages.append((item.site_key, item.page_name))
+    db.session.commit()
+
+    if affected_pages:
+        logging.warning(f"Deactivated {summary['deactivated']} media item(s) with broken links")
+        for site_key in dict.fromkeys(site for site, _ in affected_pages):
+            regenerate_pages([page for site, page in affected_pages if site == site_key], site_key)
+    return summary
+
+def start_media_check(site_key, force=False):
+    """Run check_media for one site on a background thread so a slow host can't hold up a request
+
+    Returns False when a check for that site is already running in this worker.
+    """
+    with _running_lock:
+        if site_key in _running_sites:
+            return False
+        _running_sites.add(site_key)
+
+    def run():
+        try:
+            with app.app_context():
+                check_media(force=force, site_key=site_key)
+        except Exception as e:
+            logging.error(f"Link check for site {site_key} failed: {e}")
+        finally:
+            with _running_lock:
+                _running_sites.discard(site_key)
+
+    threading.Thread(target=run, name=f'link-check-{site_key}', daemon=True).start()
+    return True
+
+@app.cli.command('check-media-links')
+@click.option('--force', is_flag=True, help='Re-check every active item, ignoring LINK_CHECK_TTL.')
+@click.option('--deactivate/--no-deactivate', default=None,
+              help='Deactivate broken items (defaults to LINK_CHECK_AUTO_DEACTIVATE).')
+@click.option('--site', 'site_key', default=None, help='Only check this site (defaults to every site).')
+def check_media_links_command(force, deactivate, site_key):
+    """Check image and video URLs for broken links."""
+    summary = check_media(force=force, deactivate=deactivate, site_key=site_key)
+    click.echo(', '.join(f"{key}: {value}" for key, value in summary.items()))
@@ -4,15 +4,19 @@ from datetime import datetime
 
 class Admin(UserMixin, db.Model):
     """Admin user model for CMS authentication"""
+    __table_args__ = (db.UniqueConstraint('site_key', 'username'), db.UniqueConstraint('site_key', 'email'))
+    
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(64), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
+    username = db.Column(db.String(64), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class SiteSettings(db.Model):
     """Site-wide settings and configuration"""
     id = db.Column(db.Integer, primary_key=True)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
     site_title = db.Column(db.String(100), default='Grand Stage Productions')
     site_slogan = db.Column(db.String(200), default='Bringing Stories to Life')
     logo_url = db.Column(db.String(500), default='/static/images/default-logo.svg')
@@ -28,9 +32,13 @@ class SiteSettings(db.Model):
 
 class PageContent(db.Model):
     """Dynamic content for different pages"""
+    __table_args__ = (db.UniqueConstraint('site_key', 'page_name'),)
+    
     id = db.Column(db.Integer, primary_key=True)
-    page_name = db.Column(db.String(50), unique=True, nullable=False)  # home, about, gallery, contact
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
+    page_name = db.Column(db.String(50), nullable=False)  # home, about, gallery, contact
     content = db.Column(db.Text, nullable=False)
+    content_html = db.Column(db.Text)  # Sanitized, minified copy of content used for public renders
     meta_title = db.Column(db.String(200))
     meta_description = db.Column(db.Text)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -38,6 +46,7 @@ class PageContent(db.Model):
 class Image(db.Model):
     """Image management with descriptions"""
     id = db.Column(db.Integer, primary_key=True)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
     title = db.Column(db.String(200), nullable=False)
     image_url = db.Column(db.String(500), nullable=False)
     description = db.Column(db.Text)
@@ -45,10 +54,14 @@ class Image(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     sort_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    link_status = db.Column(db.String(20))  # Last link check: 'ok', 'broken' or 'error'
+    link_error = db.Column(db.String(200))
+    link_checked_at = db.Column(db.DateTime)
 
 class Video(db.Model):
     """Video link management for embedded content"""
     id = db.Column(db.Integer, primary_key=True)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
     title = db.Column(db.String(200), nullable=False)
     video_url = db.Column(db.String(500), nullable=False)  # YouTube or Instagram embed URL
     description = db.Column(db.Text)
@@ -57,6 +70,9 @@ class Video(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     sort_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    link_status = db.Column(db.String(20))  # Last link check: 'ok', 'broken' or 'error'
+    link_error = db.Column(db.String(200))
+    link_checked_at = db.Column(db.DateTime)
 
     def get_embed_url(self):
         """Convert regular YouTube/Instagram URLs to embed format with improved handling"""
@@ -122,6 +138,7 @@ class EmailCredentials(db.Model):
     __tablename__ = 'email_credentials'
     
     id = db.Column(db.Integer, primary_key=True)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
     email_address = db.Column(db.String(150), nullable=False)
     app_password = db.Column(db.String(200), nullable=False)
     smtp_server = db.Column(db.String(100), default='smtp.gmail.com')
@@ -139,6 +156,7 @@ class ContactSubmission(db.Model):
     __tablename__ = 'contact_submissions'
     
     id = db.Column(db.Integer, primary_key=True)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(150), nullable=False)
     subject = db.Column(db.String(200), nullable=False)
@@ -148,3 +166,34 @@ class ContactSubmission(db.Model):
     
     def __repr__(self):
         return f'<ContactSubmission {self.name} - {self.subject}>'
+
+# Page Content Revisions
+class PageRevision(db.Model):
+    """Stored history of PageContent.content, kept small with compressed reverse deltas"""
+    __tablename__ = 'page_revisions'
+    __table_args__ = (db.UniqueConstraint('site_key', 'page_name', 'revision_number'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    site_key = db.Column(db.String(50), nullable=False, default='default', server_default='default', index=True)
+    page_name = db.Column(db.String(50), nullable=False, index=True)
+    revision_number = db.Column(db.Integer, nullable=False)
+    storage = db.Column(db.String(10), nullable=False, default='full')  # 'full' text or 'delta' from the next revision
+    data = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed
+    content_length = db.Column(db.Integer, default=0)
+    is_autosave = db.Column(db.Boolean, default=False)
+    created_by = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PageRevision {self.page_name} #{self.revision_number}>'
+
+# Rate Limiting
+class RateLimitCounter(db.Model):
+    """Per-window hit counts for the shared database rate limit backend"""
+    __tablename__ = 'rate_limit_counters'
+    __table_args__ = (db.UniqueConstraint('key', 'window_start'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    window_start = db.Column(db.BigInteger, nullable=False)  # Unix time the window began
+    count = db.Column(db.Integer, nullable=False, default=0)
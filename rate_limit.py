@@ -0,0 +1,188 @@
+import re
+import math
+import time
+import logging
+import threading
+from collections import deque
+from functools import wraps
+from flask import request
+from sqlalchemy.exc import IntegrityError
+from app import app, db
+from models import RateLimitCounter
+from sites import current_site_key
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+def parse_rate(rate):
+    """Turn '10/minute' or '5/10minutes' into (limit, window_seconds)"""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    limit, multiplier, period = match.groups()
+    return int(limit), int(multiplier or 1) * PERIODS[period]
+
+class MemoryBackend:
+    """Exact sliding-window log per key, local to one worker process"""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self.hits = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        with self.lock:
+            self.calls += 1
+            if self.calls % self.SWEEP_EVERY == 0:
+                self.sweep(now)
+
+            timestamps, _ = self.hits.get(key, (None, None))
+            if timestamps is None:
+                timestamps = deque()
+                self.hits[key] = (timestamps, window)
+            while timestamps and timestamps[0] <= now - window:
+                timestamps.popleft()
+            if len(timestamps) >= limit:
+                return False, math.ceil(timestamps[0] + window - now)
+            timestamps.append(now)
+            return True, 0
+
+    def sweep(self, now):
+        """Forget keys with no hits left inside their window"""
+        idle = [key for key, (timestamps, window) in self.hits.items()
+                if not timestamps or timestamps[-1] <= now - window]
+        for key in idle:
+            del self.hits[key]
+
+class DatabaseBackend:
+    """Sliding-window counter stored in the app database, shared by every worker
+
+    Counts live in fixed windows; the previous window's count is weighted by how
+    much of it still overlaps the sliding window.
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, engine_getter):
+        self.engine_getter = engine_getter
+        self.table = RateLimitCounter.__table__
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        with self.lock:
+            self.calls += 1
+            sweep = self.calls % self.SWEEP_EVERY == 0
+        if sweep:
+            self.sweep(now)
+
+        window_start = int(now // window * window)
+        previous_start = window_start - window
+        weight = 1 - (now - window_start) / window
+        retry_after = math.ceil(window_start + window - now)
+        table = self.table
+
+        # Use separate connections so limiter writes never join the request's transaction
+        with self.engine_getter().begin() as conn:
+            previous = conn.execute(
+                db.select(table.c.count).where(table.c.key == key, table.c.window_start == previous_start)
+            ).scalar() or 0
+        # Hits the current window can still take. The check and the increment are one
+        # conditional UPDATE, so concurrent workers can't all pass at limit - 1.
+        allowance = limit - previous * weight
+        if allowance <= 0:
+            return False, retry_after
+        if self.increment(key, window_start, allowance):
+            return True, 0
+
+        try:
+            with self.engine_getter().begin() as conn:
+                conn.execute(table.insert().values(key=key, window_start=window_start, count=1))
+                # First hit of a new window: drop this key's windows that can no longer matter
+                conn.execute(table.delete().where(table.c.key == key, table.c.window_start < previous_start))
+            return True, 0
+        except IntegrityError:
+            # The window already exists: either it is full or another worker just opened it
+            if self.increment(key, window_start, allowance):
+                return True, 0
+        return False, retry_after
+
+    def increment(self, key, window_start, allowance):
+        """Count a hit if the window is still under its allowance; False when it isn't (or doesn't exist)"""
+        table = self.table
+        with self.engine_getter().begin() as conn:
+            result = conn.execute(
+                table.update()
+                .where(table.c.key == key, table.c.window_start == window_start, table.c.count < allowance)
+                .values(count=table.c.count + 1)
+            )
+            return result.rowcount == 1
+
+    def sweep(self, now):
+        """Delete every key's windows that no configured limit can still be looking at"""
+        cutoff = now - 2 * longest_window()
+        with self.engine_getter().begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.window_start < cutoff))
+
+def longest_window():
+    return max((parse_rate(rate)[1] for rules in app.config['RATE_LIMITS'].values() for _, rate in rules),
+               default=PERIODS['day'])
+
+def get_backend():
+    backend = app.extensions.get('rate_limit_backend')
+    if backend is None:
+        if app.config['RATE_LIMIT_BACKEND'] == 'database':
+            backend = DatabaseBackend(lambda: db.engine)
+        else:
+            backend = MemoryBackend()
+        app.extensions['rate_limit_backend'] = backend
+    return backend
+
+def scope_value(scope):
+    """Value a limit is keyed on: 'ip' or 'form:<field>'"""
+    if scope == 'ip':
+        return request.remote_addr or 'unknown'
+    if scope.startswith('form:'):
+        return (request.form.get(scope[5:]) or '').strip().lower()[:200]
+    raise ValueError(f"Unknown rate limit scope: {scope!r}")
+
+def check_rate_limits(name):
+    """Record a hit against this endpoint's rules in order; returns seconds to wait, or 0
+
+    Stops at the first rule that rejects, so a client already blocked (e.g. by
+    its IP) doesn't keep spending the budget of the username or email it targets.
+    """
+    for scope, rate in app.config['RATE_LIMITS'].get(name, []):
+        value = scope_value(scope)
+        if not value:
+            continue
+        limit, window = parse_rate(rate)
+        # Keyed per site: usernames like 'admin' exist on every site
+        allowed, wait = get_backend().hit(f"{current_site_key()}:{name}:{scope}:{value}", limit, window)
+        if not allowed:
+            return wait
+    return 0
+
+def rate_limited(name):
+    """Reject POSTs over the configured limits before the view does any hashing or I/O"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'POST' and app.config['RATE_LIMIT_ENABLED']:
+                try:
+                    retry_after = check_rate_limits(name)
+                except Exception as e:
+                    # A broken limiter store should not take the endpoint down with it
+                    logging.error(f"Rate limit check failed for {name}: {e}")
+                    retry_after = 0
+                if retry_after:
+                    logging.warning(f"Rate limit hit for {name} from {request.remote_addr}")
+                    return ('Too many requests. Please try again later.', 429,
+                            {'Retry-After': str(max(1, retry_after)), 'Content-Type': 'text/plain; charset=utf-8'})
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
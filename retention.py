@@ -0,0 +1,166 @@
+import os
+import json
+import gzip
+import time
+import click
+from datetime import datetime, timedelta
+from app import app, db
+from models import ContactSubmission
+
+ARCHIVE_PREFIX = 'contact_submissions-'
+ARCHIVE_SUFFIX = '.jsonl.gz'
+
+ARCHIVED_FIELDS = ('id', 'site_key', 'name', 'email', 'subject', 'message', 'submitted_at', 'is_read')
+
+def get_archive_dir():
+    return app.config['CONTACT_ARCHIVE_DIR']
+
+def submission_to_record(submission):
+    record = {field: getattr(submission, field) for field in ARCHIVED_FIELDS}
+    record['submitted_at'] = submission.submitted_at.isoformat() if submission.submitted_at else None
+    return record
+
+def record_to_submission(record):
+    submitted_at = record.get('submitted_at')
+    return ContactSubmission(
+        id=record['id'],
+        site_key=record.get('site_key', 'default'),
+        name=record['name'],
+        email=record['email'],
+        subject=record['subject'],
+        message=record['message'],
+        submitted_at=datetime.fromisoformat(submitted_at) if submitted_at else None,
+        is_read=record.get('is_read', True)
+    )
+
+def append_archive_batch(path, records):
+    """Append one gzip member per batch and fsync it before the rows are deleted"""
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+            for record in records:
+                archive.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def archive_submissions(days=None, batch_size=None, pause=0.0, dry_run=False):
+    """Move read submissions older than the retention window into a compressed archive
+
+    Rows are handled in id-ordered batches, each written to disk before it is
+    deleted in its own short transaction, so the table is never locked for
+    long and an interrupted run loses nothing (at worst a batch is archived
+    twice; restore skips ids that already exist).
+    """
+    days = app.config['CONTACT_RETENTION_DAYS'] if days is None else days
+    batch_size = batch_size or app.config['CONTACT_RETENTION_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    expired = db.and_(ContactSubmission.is_read.is_(True), ContactSubmission.submitted_at < cutoff)
+
+    if dry_run:
+        return db.session.query(db.func.count(ContactSubmission.id)).filter(expired).scalar(), None
+
+    os.makedirs(get_archive_dir(), exist_ok=True)
+    path = os.path.join(get_archive_dir(), f"{ARCHIVE_PREFIX}{datetime.utcnow():%Y%m%dT%H%M%S}{ARCHIVE_SUFFIX}")
+    archived = 0
+    last_id = 0
+    while True:
+        batch = ContactSubmission.query.filter(expired, ContactSubmission.id > last_id).order_by(
+            ContactSubmission.id).limit(batch_size).all()
+        if not batch:
+            break
+        ids = [submission.id for submission in batch]
+        append_archive_batch(path, [submission_to_record(submission) for submission in batch])
+        ContactSubmission.query.filter(ContactSubmission.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        archived += len(ids)
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+    return archived, path if archived else None
+
+def iter_archive_records():
+    """Yield (file name, record) for every archived submission, oldest archive first"""
+    archive_dir = get_archive_dir()
+    if not os.path.isdir(archive_dir):
+        return
+    for filename in sorted(os.listdir(archive_dir)):
+        if not (filename.startswith(ARCHIVE_PREFIX) and filename.endswith(ARCHIVE_SUFFIX)):
+            continue
+        with gzip.open(os.path.join(archive_dir, filename), 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                if line.strip():
+                    yield filename, json.loads(line)
+
+def search_archive(text=None, email=None, ids=None):
+    """Archived submissions matching any given filter (all of them when no filter is set)"""
+    text = text.lower() if text else None
+    email = email.lower() if email else None
+    ids = set(ids) if ids else None
+    for filename, record in iter_archive_records():
+        if ids is not None and record['id'] not in ids:
+            continue
+        if email and (record.get('email') or '').lower() != email:
+            continue
+        if text and not any(text in (record.get(field) or '').lower()
+                            for field in ('name', 'email', 'subject', 'message')):
+            continue
+        yield filename, record
+
+def restore_submissions(ids):
+    """Put archived submissions back into the table, skipping ids that are already present
+
+    Restored rows come back unread so the next retention run leaves them alone
+    until an admin has looked at them again.
+    """
+    existing = {row.id for row in db.session.query(ContactSubmission.id).filter(ContactSubmission.id.in_(ids))}
+    restored = []
+    for _, record in search_archive(ids=ids):
+        if record['id'] in existing:
+            continue
+        submission = record_to_submission(record)
+        submission.is_read = False
+        db.session.add(submission)
+        existing.add(record['id'])
+        restored.append(record['id'])
+    db.session.commit()
+    return restored
+
+@app.cli.group('contact-archive')
+def contact_archive_cli():
+    """Archive, search and restore old contact submissions."""
+
+@contact_archive_cli.command('run')
+@click.option('--days', type=int, default=None, help='Archive read submissions older than this (defaults to CONTACT_RETENTION_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Rows archived and deleted per transaction.')
+@click.option('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+@click.option('--dry-run', is_flag=True, help='Only count what would be archived.')
+def archive_command(days, batch_size, pause, dry_run):
+    """Archive and delete expired submissions (safe to run from cron)."""
+    count, path = archive_submissions(days=days, batch_size=batch_size, pause=pause, dry_run=dry_run)
+    if dry_run:
+        click.echo(f"{count} submission(s) would be archived")
+    elif path:
+        click.echo(f"Archived {count} submission(s) to {path}")
+    else:
+        click.echo("Nothing to archive")
+
+@contact_archive_cli.command('search')
+@click.argument('text', required=False)
+@click.option('--email', default=None, help='Exact sender email address.')
+def search_command(text, email):
+    """Search archived submissions by text or sender."""
+    found = 0
+    for filename, record in search_archive(text=text, email=email):
+        found += 1
+        click.echo(f"#{record['id']}  {record.get('site_key', 'default')}  {record['submitted_at']}  {record['name']} <{record['email']}>  "
+                   f"{record['subject']}  [{filename}]")
+    click.echo(f"{found} match(es)")
+
+@contact_archive_cli.command('restore')
+@click.argument('ids', nargs=-1, type=int, required=True)
+def restore_command(ids):
+    """Restore archived submissions by id."""
+    restored = restore_submissions(list(ids))
+    missing = sorted(set(ids) - set(restored))
+    click.echo(f"Restored {len(restored)} submission(s)")
+    if missing:
+        click.echo(f"Not restored (already present or not archived): {', '.join(map(str, missing))}")
@@ -0,0 +1,146 @@
+import re
+import json
+import zlib
+import difflib
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import PageRevision
+from sites import current_site_key, site_query
+
+# Every Nth revision keeps its full text so rebuilding an old version never
+# has to walk back through more than N deltas
+SNAPSHOT_INTERVAL = 25
+
+# Split HTML after each tag and line break; pasted markup is often one long line
+TOKEN_RE = re.compile(r'(?<=[>\n])')
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.split(text) if token]
+
+def make_delta(base_text, target_text):
+    """Describe target_text in terms of base_text: [start, end] copies a token range, strings are inserted"""
+    base_tokens = tokenize(base_text)
+    target_tokens = tokenize(target_text)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_tokens, target_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(target_tokens[j1:j2]))
+    return ops
+
+def apply_delta(base_text, ops):
+    """Rebuild the text a delta was made for"""
+    base_tokens = tokenize(base_text)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_tokens[op[0]:op[1]])
+    return ''.join(parts)
+
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), 9)
+
+def decompress_text(data):
+    return zlib.decompress(data).decode('utf-8')
+
+def get_head_revision(page_name, lock=False):
+    """Newest revision for a page; its text is always stored in full"""
+    query = site_query(PageRevision).filter_by(page_name=page_name).order_by(PageRevision.revision_number.desc())
+    if lock:
+        query = query.with_for_update()
+    return query.first()
+
+def record_revision(page_name, text, previous_text=None, is_autosave=False, created_by=None):
+    """Add a revision to the session (the caller commits)
+
+    The new revision becomes the head and is stored in full; the old head is
+    rewritten as a compressed delta against it unless it falls on a snapshot
+    boundary. Text identical to the head does not create a new revision.
+    """
+    # Lock the head so a concurrent save waits instead of taking the same number;
+    # commit_with_revision retries the rare conflict the lock can't prevent
+    head = get_head_revision(page_name, lock=True)
+    if head is None and previous_text is not None and previous_text != text:
+        # Keep the content that existed before history tracking started
+        head = PageRevision(site_key=current_site_key(), page_name=page_name, revision_number=1, storage='full',
+                            data=compress_text(previous_text), content_length=len(previous_text),
+                            created_by=created_by)
+        db.session.add(head)
+
+    if head is not None:
+        head_text = decompress_text(head.data)
+        if head_text == text:
+            # An explicit save of an autosaved draft just marks that draft as saved
+            if not is_autosave:
+                head.is_autosave = False
+            return head
+        if head.revision_number % SNAPSHOT_INTERVAL != 0:
+            delta = make_delta(text, head_text)
+            head.data = zlib.compress(json.dumps(delta, separators=(',', ':')).encode('utf-8'), 9)
+            head.storage = 'delta'
+
+    revision = PageRevision(
+        site_key=current_site_key(),
+        page_name=page_name,
+        revision_number=head.revision_number + 1 if head else 1,
+        storage='full',
+        data=compress_text(text),
+        content_length=len(text),
+        is_autosave=is_autosave,
+        created_by=created_by
+    )
+    db.session.add(revision)
+    return revision
+
+def commit_with_revision(apply_changes):
+    """Call apply_changes() (which records a revision) and commit, returning its result
+
+    If a concurrent save (e.g. an autosave still in flight) took the same
+    revision number, the transaction is rolled back and run once more.
+    """
+    for attempt in range(2):
+        result = apply_changes()
+        try:
+            db.session.commit()
+            return result
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+
+def get_revision_text(page_name, revision_number):
+    """Rebuild the text of a revision from the nearest full copy at or above it"""
+    full_number = db.session.query(db.func.min(PageRevision.revision_number)).filter(
+        PageRevision.site_key == current_site_key(),
+        PageRevision.page_name == page_name,
+        PageRevision.revision_number >= revision_number,
+        PageRevision.storage == 'full'
+    ).scalar()
+    if full_number is None:
+        return None
+
+    rows = site_query(PageRevision).filter(
+        PageRevision.page_name == page_name,
+        PageRevision.revision_number >= revision_number,
+        PageRevision.revision_number <= full_number
+    ).order_by(PageRevision.revision_number.desc()).all()
+    if not rows or rows[-1].revision_number != revision_number:
+        return None
+
+    text = decompress_text(rows[0].data)
+    for row in rows[1:]:
+        text = apply_delta(text, json.loads(zlib.decompress(row.data)))
+    return text
+
+def get_recent_revisions(page_name, limit=20):
+    return site_query(PageRevision).filter_by(page_name=page_name).order_by(
+        PageRevision.revision_number.desc()).limit(limit).all()
+
+def diff_revision(old_text, new_text, old_label, new_label):
+    """Unified diff lines between two versions of page content"""
+    return list(difflib.unified_diff(old_text.splitlines(), new_text.splitlines(),
+                                     fromfile=old_label, tofile=new_label, lineterm=''))
@@ -5,23 +5,43 @@ from app import app, db
 from models import Admin, SiteSettings, PageContent, Image, Video, EmailCredentials, ContactSubmission
 from forms import LoginForm, PageContentForm, SiteSettingsForm, ImageForm, VideoForm, ContactForm, EmailCredentialsForm
 from email_utils import send_contact_notification
+from auth_utils import remember_identity, forget_identity
+from rate_limit import rate_limited
+from health import get_readiness
+from link_checker import start_media_check
+from sites import current_site_key, site_query, site_cache
+from html_utils import render_content_html
+from revisions import record_revision, commit_with_revision, get_revision_text, get_recent_revisions, diff_revision
+from static_export import is_static_export_enabled, regenerate_pages, regenerate_all_pages
 
 def get_site_settings():
-    """Helper function to get site settings"""
-    return SiteSettings.query.first() or SiteSettings()
+    """Helper function to get site settings (cached per site)"""
+    def load():
+        settings = site_query(SiteSettings).first()
+        if settings is None:
+            return SiteSettings()
+        # Detach so the cached copy is never expired or refreshed by later commits
+        db.session.expunge(settings)
+        return settings
+    return site_cache.get(current_site_key(), 'settings', load)
 
 def get_page_content(page_name):
-    """Helper function to get page content"""
-    content = PageContent.query.filter_by(page_name=page_name).first()
-    return content.content if content else f"<h2>Welcome to {page_name.title()}</h2>"
+    """Helper function to get page content (cached per site)"""
+    def load():
+        content = site_query(PageContent).filter_by(page_name=page_name).first()
+        if not content:
+            return f"<h2>Welcome to {page_name.title()}</h2>"
+        # Rows saved before content_html existed are sanitized on the fly until backfilled
+        return content.content_html if content.content_html is not None else render_content_html(content.content)
+    return site_cache.get(current_site_key(), f'page:{page_name}', load)
 
 def get_page_images(page_name):
     """Helper function to get images for a page"""
-    return Image.query.filter_by(page_name=page_name, is_active=True).order_by(Image.sort_order).all()
+    return site_query(Image).filter_by(page_name=page_name, is_active=True).order_by(Image.sort_order).all()
 
 def get_page_videos(page_name):
     """Helper function to get videos for a page"""
-    return Video.query.filter_by(page_name=page_name, is_active=True).order_by(Video.sort_order).all()
+    return site_query(Video).filter_by(page_name=page_name, is_active=True).order_by(Video.sort_order).all()
 
 # Public Routes
 @app.route('/')
@@ -67,16 +87,20 @@ def gallery():
                          page_name='gallery')
 
 @app.route('/contact', methods=['GET', 'POST'])
+@rate_limited('contact')
 def contact():
     settings = get_site_settings()
     content = get_page_content('contact')
     images = get_page_images('contact')
     videos = get_page_videos('contact')
-    form = ContactForm()
+    # Frozen copies of this page are served without a session, so their form
+    # can't carry a CSRF token tied to one; the export and this POST check the same setting
+    form = ContactForm(meta={'csrf': False}) if is_static_export_enabled() else ContactForm()
     
     if form.validate_on_submit():
         # Create contact submission
         submission = ContactSubmission(
+            site_key=current_site_key(),
             name=form.name.data,
             email=form.email.data,
             subject=form.subject.data,
@@ -116,15 +140,18 @@ def contact():
                          page_name='contact')
 # Admin Routes
 @app.route('/admin/login', methods=['GET', 'POST'])
+@rate_limited('admin_login')
 def admin_login():
     if current_user.is_authenticated:
         return redirect(url_for('admin_dashboard'))
         
     form = LoginForm()
     if form.validate_on_submit():
-        admin = Admin.query.filter_by(username=form.username.data).first()
+        # Admin accounts belong to one site and can't sign in on another site's host
+        admin = site_query(Admin).filter_by(username=form.username.data).first()
         if admin and check_password_hash(admin.password_hash, form.password.data):
             login_user(admin)
+            remember_identity(admin)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('admin_dashboard'))
         flash('Invalid username or password', 'danger')
@@ -135,6 +162,7 @@ def admin_login():
 @login_required
 def admin_logout():
     logout_user()
+    forget_identity()
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
 
@@ -143,10 +171,10 @@ def admin_logout():
 @login_required
 def admin_dashboard():
     settings = get_site_settings()
-    total_images = Image.query.count()
-    total_videos = Video.query.count()
-    total_pages = PageContent.query.count()
-    total_submissions = ContactSubmission.query.count()
+    total_images = site_query(Image).count()
+    total_videos = site_query(Video).count()
+    total_pages = site_query(PageContent).count()
+    total_submissions = site_query(ContactSubmission).count()
     
     return render_template('admin/dashboard.html',
                          settings=settings,
@@ -165,35 +193,116 @@ def admin_content(page_name=None):
         form.page_name.data = page_name
     
     if form.validate_on_submit():
-        content = PageContent.query.filter_by(page_name=form.page_name.data).first()
-        if not content:
-            content = PageContent(page_name=form.page_name.data)
-        
-        content.content = form.content.data
-        content.meta_title = form.meta_title.data
-        content.meta_description = form.meta_description.data
+        def save():
+            content = site_query(PageContent).filter_by(page_name=form.page_name.data).first()
+            if not content:
+                content = PageContent(site_key=current_site_key(), page_name=form.page_name.data)
+            
+            record_revision(content.page_name, form.content.data, previous_text=content.content,
+                            created_by=current_user.username)
+            content.content = form.content.data
+            content.content_html = render_content_html(form.content.data)
+            content.meta_title = form.meta_title.data
+            content.meta_description = form.meta_description.data
+            db.session.add(content)
+            return content
         
-        db.session.add(content)
-        db.session.commit()
+        try:
+            content = commit_with_revision(save)
+        except Exception as e:
+            db.session.rollback()
+            flash('Error saving content. Please try again.', 'error')
+            return redirect(url_for('admin_content', page_name=form.page_name.data))
+        site_cache.invalidate(current_site_key(), f'page:{content.page_name}')
+        regenerate_pages([content.page_name])
         flash(f'Content for {form.page_name.data} page updated successfully!', 'success')
         return redirect(url_for('admin_content', page_name=form.page_name.data))
     
     # Load existing content if editing
     if page_name:
-        content = PageContent.query.filter_by(page_name=page_name).first()
+        content = site_query(PageContent).filter_by(page_name=page_name).first()
         if content:
             form.page_name.data = content.page_name
             form.content.data = content.content
             form.meta_title.data = content.meta_title
             form.meta_description.data = content.meta_description
     
-    return render_template('admin/edit_content.html', form=form, page_name=page_name)
+    revisions = []
+    compare_revision = None
+    diff_lines = None
+    if page_name:
+        revisions = get_recent_revisions(page_name)
+        compare_revision = request.args.get('compare', type=int)
+        if compare_revision:
+            revision_text = get_revision_text(page_name, compare_revision)
+            if revision_text is None:
+                flash(f'Revision {compare_revision} not found.', 'warning')
+                compare_revision = None
+            else:
+                current_text = content.content if content else ''
+                diff_lines = diff_revision(revision_text, current_text,
+                                           f'revision {compare_revision}', 'current')
+    
+    return render_template('admin/edit_content.html', form=form, page_name=page_name,
+                         revisions=revisions, compare_revision=compare_revision, diff_lines=diff_lines)
+
+@app.route('/admin/content/<page_name>/autosave', methods=['POST'])
+@login_required
+def admin_content_autosave(page_name):
+    """Store an autosaved draft as a revision without publishing it"""
+    form = PageContentForm()
+    form.page_name.data = page_name
+    if not form.validate_on_submit():
+        return jsonify({"saved": False, "errors": form.errors}), 400
+    
+    def save():
+        content = site_query(PageContent).filter_by(page_name=page_name).first()
+        return record_revision(page_name, form.content.data,
+                               previous_text=content.content if content else None,
+                               is_autosave=True, created_by=current_user.username)
+    
+    try:
+        revision = commit_with_revision(save)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"saved": False, "errors": {"revision": [str(e)]}}), 500
+    
+    return jsonify({"saved": True, "revision": revision.revision_number})
+
+@app.route('/admin/content/<page_name>/revisions/<int:revision_number>/restore', methods=['POST'])
+@login_required
+def admin_restore_revision(page_name, revision_number):
+    """Publish an earlier revision as the current page content"""
+    site_query(PageContent).filter_by(page_name=page_name).first_or_404()
+    revision_text = get_revision_text(page_name, revision_number)
+    if revision_text is None:
+        flash(f'Revision {revision_number} not found.', 'error')
+        return redirect(url_for('admin_content', page_name=page_name))
+    
+    def restore():
+        content = site_query(PageContent).filter_by(page_name=page_name).first()
+        record_revision(page_name, revision_text, previous_text=content.content,
+                        created_by=current_user.username)
+        content.content = revision_text
+        content.content_html = render_content_html(revision_text)
+    
+    try:
+        commit_with_revision(restore)
+    except Exception as e:
+        db.session.rollback()
+        flash('Error restoring revision. Please try again.', 'error')
+        return redirect(url_for('admin_content', page_name=page_name))
+    
+    site_cache.invalidate(current_site_key(), f'page:{page_name}')
+    regenerate_pages([page_name])
+    flash(f'Revision {revision_number} restored for {page_name} page.', 'success')
+    return redirect(url_for('admin_content', page_name=page_name))
 
 @app.route('/admin/images')
 @login_required
 def admin_images():
     page = request.args.get('page', 1, type=int)
-    images = Image.query.order_by(Image.page_name, Image.sort_order).paginate(
+    images = site_query(Image).order_by(Image.page_name, Image.sort_order).paginate(
         page=page, per_page=10, error_out=False)
     return render_template('admin/manage_images.html', images=images)
 
@@ -202,18 +311,24 @@ def admin_images():
 @login_required
 def admin_image_form(image_id=None):
     if image_id:
-        image = Image.query.get_or_404(image_id)
+        image = site_query(Image).filter_by(id=image_id).first_or_404()
         form = ImageForm(obj=image)
         form.sort_order.data = str(image.sort_order)
     else:
         image = None
         form = ImageForm()
+    previous_page = image.page_name if image else None
     
     if form.validate_on_submit():
         if not image:
-            image = Image()
+            image = Image(site_key=current_site_key())
         
         image.title = form.title.data
+        if image.image_url != form.image_url.data:
+            # A new URL needs a fresh link check
+            image.link_status = None
+            image.link_error = None
+            image.link_checked_at = None
         image.image_url = form.image_url.data
         image.description = form.description.data
         image.page_name = form.page_name.data
@@ -222,6 +337,7 @@ def admin_image_form(image_id=None):
         
         db.session.add(image)
         db.session.commit()
+        regenerate_pages([previous_page, image.page_name])
         
         flash('Image saved successfully!', 'success')
         return redirect(url_for('admin_images'))
@@ -231,9 +347,10 @@ def admin_image_form(image_id=None):
 @app.route('/admin/images/delete/<int:image_id>', methods=['POST'])
 @login_required
 def admin_delete_image(image_id):
-    image = Image.query.get_or_404(image_id)
+    image = site_query(Image).filter_by(id=image_id).first_or_404()
     db.session.delete(image)
     db.session.commit()
+    regenerate_pages([image.page_name])
     flash('Image deleted successfully!', 'success')
     return redirect(url_for('admin_images'))
 
@@ -241,7 +358,7 @@ def admin_delete_image(image_id):
 @login_required
 def admin_videos():
     page = request.args.get('page', 1, type=int)
-    videos = Video.query.order_by(Video.page_name, Video.sort_order).paginate(
+    videos = site_query(Video).order_by(Video.page_name, Video.sort_order).paginate(
         page=page, per_page=10, error_out=False)
     return render_template('admin/manage_videos.html', videos=videos)
 
@@ -250,18 +367,24 @@ def admin_videos():
 @login_required
 def admin_video_form(video_id=None):
     if video_id:
-        video = Video.query.get_or_404(video_id)
+        video = site_query(Video).filter_by(id=video_id).first_or_404()
         form = VideoForm(obj=video)
         form.sort_order.data = str(video.sort_order)
     else:
         video = None
         form = VideoForm()
+    previous_page = video.page_name if video else None
     
     if form.validate_on_submit():
         if not video:
-            video = Video()
+            video = Video(site_key=current_site_key())
         
         video.title = form.title.data
+        if video.video_url != form.video_url.data:
+            # A new URL needs a fresh link check
+            video.link_status = None
+            video.link_error = None
+            video.link_checked_at = None
         video.video_url = form.video_url.data
         video.description = form.description.data
         video.video_type = form.video_type.data
@@ -271,6 +394,7 @@ def admin_video_form(video_id=None):
         
         db.session.add(video)
         db.session.commit()
+        regenerate_pages([previous_page, video.page_name])
         
         flash('Video saved successfully!', 'success')
         return redirect(url_for('admin_videos'))
@@ -280,18 +404,33 @@ def admin_video_form(video_id=None):
 @app.route('/admin/videos/delete/<int:video_id>', methods=['POST'])
 @login_required
 def admin_delete_video(video_id):
-    video = Video.query.get_or_404(video_id)
+    video = site_query(Video).filter_by(id=video_id).first_or_404()
     db.session.delete(video)
     db.session.commit()
+    regenerate_pages([video.page_name])
     flash('Video deleted successfully!', 'success')
     return redirect(url_for('admin_videos'))
 
+@app.route('/admin/media/check-links', methods=['POST'])
+@login_required
+def admin_check_media_links():
+    """Start a background check of this site's image and video URLs"""
+    if start_media_check(current_site_key(), force=request.form.get('force') == '1'):
+        flash('Link check started. Refresh this page in a minute to see the results.', 'info')
+    else:
+        flash('A link check is already running for this site.', 'info')
+    # Only ever go back to one of the two pages with a Check Links button
+    next_page = request.form.get('next')
+    if next_page not in (url_for('admin_images'), url_for('admin_videos')):
+        next_page = url_for('admin_images')
+    return redirect(next_page)
+
 @app.route('/admin/settings', methods=['GET', 'POST'])
 @login_required
 def admin_settings():
-    settings = SiteSettings.query.first()
+    settings = site_query(SiteSettings).first()
     if not settings:
-        settings = SiteSettings()
+        settings = SiteSettings(site_key=current_site_key())
         db.session.add(settings)
         db.session.commit()
     
@@ -300,6 +439,8 @@ def admin_settings():
     if form.validate_on_submit():
         form.populate_obj(settings)
         db.session.commit()
+        site_cache.invalidate(current_site_key(), 'settings')
+        regenerate_all_pages()
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('admin_settings'))
     
@@ -310,7 +451,7 @@ def admin_settings():
 @login_required
 def admin_system_credentials():
     """System credentials management page"""
-    credentials = EmailCredentials.query.first()
+    credentials = site_query(EmailCredentials).first()
     form = EmailCredentialsForm(obj=credentials)
     
     if form.validate_on_submit():
@@ -324,6 +465,7 @@ def admin_system_credentials():
         else:
             # Create new credentials
             credentials = EmailCredentials(
+                site_key=current_site_key(),
                 email_address=form.email_address.data,
                 app_password=form.app_password.data,
                 smtp_server=form.smtp_server.data,
@@ -342,7 +484,7 @@ def admin_system_credentials():
         return redirect(url_for('admin_system_credentials'))
     
     # Get contact submissions
-    submissions = ContactSubmission.query.order_by(ContactSubmission.submitted_at.desc()).limit(10).all()
+    submissions = site_query(ContactSubmission).order_by(ContactSubmission.submitted_at.desc()).limit(10).all()
     
     return render_template('admin/system_credentials.html', 
                          form=form, 
@@ -354,14 +496,14 @@ def admin_system_credentials():
 @login_required
 def admin_contact_submissions():
     """View all contact form submissions"""
-    submissions = ContactSubmission.query.order_by(ContactSubmission.submitted_at.desc()).all()
+    submissions = site_query(ContactSubmission).order_by(ContactSubmission.submitted_at.desc()).all()
     return render_template('admin/contact_submissions.html', submissions=submissions)
 
 @app.route('/admin/contact-submissions/<int:submission_id>/mark-read')
 @login_required
 def mark_submission_read(submission_id):
     """Mark a contact submission as read"""
-    submission = ContactSubmission.query.get_or_404(submission_id)
+    submission = site_query(ContactSubmission).filter_by(id=submission_id).first_or_404()
     submission.is_read = True
     
     try:
@@ -377,7 +519,7 @@ def mark_submission_read(submission_id):
 @login_required
 def admin_delete_submission(submission_id):
     """Delete a contact submission"""
-    submission = ContactSubmission.query.get_or_404(submission_id)
+    submission = site_query(ContactSubmission).filter_by(id=submission_id).first_or_404()
     
     try:
         db.session.delete(submission)
@@ -394,27 +536,23 @@ def admin_delete_submission(submission_id):
 def inject_settings():
     return {'site_settings': get_site_settings()}
 
-from flask import jsonify
-from app import db
-from models import PageContent
+def fragment_cache_version():
+    """Cached chrome in base.html is reused until the site's settings change"""
+    settings = get_site_settings()
+    if settings.id is None:
+        return None
+    return (current_site_key(), settings.id, settings.updated_at)
 
-@app.route('/check-contact')
-def check_contact():
-    try:
-        # Check if 'page_content' table exists
-        inspector = db.inspect(db.engine)
-        tables = inspector.get_table_names()
-        table_exists = 'page_content' in tables
+app.jinja_env.fragment_cache_version = fragment_cache_version
 
-        # Check if contact page exists in the table
-        contact_entry = PageContent.query.filter_by(page_name='contact').first()
-        contact_exists = contact_entry is not None
-        snippet = contact_entry.content[:200] if contact_entry else None
+# Health Checks
+@app.route('/healthz')
+def healthz():
+    """Liveness: the worker is up and serving requests; touches nothing else"""
+    return jsonify({"status": "ok"})
 
-        return jsonify({
-            "table_exists": table_exists,
-            "contact_page_exists": contact_exists,
-            "content_snippet": snippet
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+@app.route('/readyz')
+def readyz():
+    """Readiness: cached, time-bounded database ping plus startup schema and email status"""
+    report = get_readiness()
+    return jsonify(report), 200 if report['ready'] else 503
@@ -0,0 +1,96 @@
+import json
+import time
+import threading
+from flask import g, has_request_context, request
+
+DEFAULT_SITE = 'default'
+
+def parse_sites(raw):
+    """Parse the SITES setting: {"site_key": {"hosts": [...], "url": "https://..."}}"""
+    sites = json.loads(raw) if raw else {}
+    if not sites:
+        return {DEFAULT_SITE: {'hosts': [], 'url': None}}
+    for site_key, site in sites.items():
+        site.setdefault('hosts', [])
+        site.setdefault('url', None)
+        site['hosts'] = [host.lower() for host in site['hosts']]
+    return sites
+
+class SiteRegistry:
+    """Maps request hosts to site keys; the first configured site is the fallback"""
+
+    def __init__(self):
+        self.sites = {DEFAULT_SITE: {'hosts': [], 'url': None}}
+        self.hosts = {}
+        self.default_key = DEFAULT_SITE
+
+    def configure(self, sites):
+        self.sites = sites
+        self.default_key = next(iter(sites))
+        self.hosts = {host: site_key for site_key, site in sites.items() for host in site['hosts']}
+
+    @property
+    def is_multi_site(self):
+        return len(self.sites) > 1
+
+    def keys(self):
+        return list(self.sites)
+
+    def resolve(self, host):
+        host = (host or '').lower()
+        return self.hosts.get(host) or self.hosts.get(host.split(':')[0]) or self.default_key
+
+    def get_url(self, site_key):
+        return self.sites.get(site_key, {}).get('url')
+
+registry = SiteRegistry()
+
+def current_site_key():
+    """Site for the current request, or the default site outside of one (CLI, startup)"""
+    if has_request_context():
+        site_key = g.get('site_key')
+        if site_key is None:
+            site_key = g.site_key = registry.resolve(request.host)
+        return site_key
+    return registry.default_key
+
+def site_query(model, site_key=None):
+    """model.query limited to one site (the current one by default)"""
+    return model.query.filter_by(site_key=site_key or current_site_key())
+
+class SiteCache:
+    """Small per-site, per-process cache with a TTL
+
+    Writes in this worker invalidate immediately; other workers see a change
+    once their entry expires.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, site_key, name, loader):
+        entry = self.entries.get((site_key, name))
+        if entry and entry[0] > time.time():
+            return entry[1]
+        value = loader()
+        with self.lock:
+            self.entries[(site_key, name)] = (time.time() + self.ttl, value)
+        return value
+
+    def invalidate(self, site_key, name=None):
+        with self.lock:
+            for key in list(self.entries):
+                if key[0] == site_key and (name is None or key[1] == name):
+                    del self.entries[key]
+
+site_cache = SiteCache()
+
+def init_sites(app):
+    registry.configure(parse_sites(app.config.get('SITES')))
+    site_cache.ttl = app.config['SITE_CACHE_TTL']
+
+    @app.before_request
+    def resolve_site():
+        g.site_key = registry.resolve(request.host)
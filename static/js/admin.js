@@ -567,9 +567,25 @@ function initializeAutoSave() {
 
 function autoSaveForm(form) {
     const formData = new FormData(form);
-    const data = Object.fromEntries(formData.entries());
+    
+    // Forms with a server endpoint keep their drafts in the revision history
+    const autosaveUrl = form.dataset.autosaveUrl;
+    if (autosaveUrl) {
+        fetch(autosaveUrl, { method: 'POST', body: formData, credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(result => {
+                if (result.saved) {
+                    showNotification(`Draft saved as revision #${result.revision}`, 'info', 2000);
+                } else {
+                    showNotification('Draft could not be saved', 'warning', 3000);
+                }
+            })
+            .catch(() => showNotification('Draft could not be saved', 'warning', 3000));
+        return;
+    }
     
     // Save to localStorage
+    const data = Object.fromEntries(formData.entries());
     const formId = form.id || 'autosave_form';
     localStorage.setItem(`autosave_${formId}`, JSON.stringify(data));
     
@@ -0,0 +1,130 @@
+import os
+import shutil
+import logging
+from xml.sax.saxutils import escape
+import click
+from flask import g
+from app import app
+from models import PageContent
+from sites import current_site_key, registry, site_query
+
+# Public pages that can be frozen to disk: page_name -> (endpoint, URL path, output file)
+EXPORT_PAGES = {
+    'home': ('index', '/', 'index.html'),
+    'about': ('about', '/about', os.path.join('about', 'index.html')),
+    'gallery': ('gallery', '/gallery', os.path.join('gallery', 'index.html')),
+    'contact': ('contact', '/contact', os.path.join('contact', 'index.html')),
+}
+
+SITEMAP_FILE = 'sitemap.xml'
+
+def site_output_dir(base_dir, site_key):
+    """Each site gets its own subdirectory in multi-site mode"""
+    return os.path.join(base_dir, site_key) if registry.is_multi_site else base_dir
+
+def is_static_export_enabled():
+    """Frozen pages are served; their contact form is rendered and accepted without a CSRF token"""
+    return bool(app.config.get('STATIC_EXPORT_DIR'))
+
+def get_export_dir(site_key=None):
+    """Output directory for the frozen site, or None when static export is disabled"""
+    if not is_static_export_enabled():
+        return None
+    return site_output_dir(app.config['STATIC_EXPORT_DIR'], site_key or current_site_key())
+
+def get_site_url(site_key=None):
+    """Public base URL used for absolute links in the frozen pages and sitemap"""
+    return registry.get_url(site_key or current_site_key()) or app.config.get('SITE_URL') or 'http://localhost/'
+
+def write_atomic(output_dir, relative_path, data):
+    """Write a file next to its final location and swap it in with a single rename"""
+    target = os.path.join(output_dir, relative_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+
+def render_page(page_name, site_key):
+    """Render a public page exactly as an anonymous visitor would receive it"""
+    endpoint, path, _ = EXPORT_PAGES[page_name]
+    # A fresh app context keeps g (and Flask-Login's cached user) of an admin
+    # request that triggered the export out of the rendered page
+    with app.app_context(), app.test_request_context(path, base_url=get_site_url(site_key)):
+        g.site_key = site_key
+        return app.view_functions[endpoint]()
+
+def render_sitemap(site_key):
+    """Build sitemap.xml for the exported pages"""
+    updated = {page.page_name: page.updated_at for page in site_query(PageContent, site_key).all()}
+    base_url = get_site_url(site_key).rstrip('/')
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for page_name, (_, path, _) in EXPORT_PAGES.items():
+        lines.append('  <url>')
+        lines.append(f'    <loc>{escape(base_url + path)}</loc>')
+        if updated.get(page_name):
+            lines.append(f'    <lastmod>{updated[page_name].strftime("%Y-%m-%d")}</lastmod>')
+        lines.append('  </url>')
+    lines.append('</urlset>')
+    return '\n'.join(lines) + '\n'
+
+def export_site(output_dir, site_key):
+    """Freeze every public page of a site plus its sitemap into output_dir"""
+    # Render everything into a staging directory first so a rendering error
+    # never leaves the live directory with a mix of old and new pages
+    staging_dir = output_dir.rstrip(os.sep) + '.staging'
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    files = {filename: render_page(page_name, site_key) for page_name, (_, _, filename) in EXPORT_PAGES.items()}
+    files[SITEMAP_FILE] = render_sitemap(site_key)
+    for filename, data in files.items():
+        write_atomic(staging_dir, filename, data)
+
+    for filename in files:
+        target = os.path.join(output_dir, filename)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(os.path.join(staging_dir, filename), target)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return sorted(files)
+
+def regenerate_pages(page_names, site_key=None):
+    """Re-render only the given pages after an admin change (no-op when export is disabled)"""
+    site_key = site_key or current_site_key()
+    output_dir = get_export_dir(site_key)
+    if not output_dir:
+        return []
+
+    page_names = [name for name in dict.fromkeys(page_names) if name in EXPORT_PAGES]
+    written = []
+    try:
+        for page_name in page_names:
+            filename = EXPORT_PAGES[page_name][2]
+            write_atomic(output_dir, filename, render_page(page_name, site_key))
+            written.append(filename)
+        if written:
+            # lastmod dates follow page content, so keep the sitemap in step
+            write_atomic(output_dir, SITEMAP_FILE, render_sitemap(site_key))
+            written.append(SITEMAP_FILE)
+    except Exception as e:
+        # The database change is already committed; a stale page is better than a failed save
+        logging.error(f"Static export regeneration failed for {page_names}: {e}")
+    return written
+
+def regenerate_all_pages(site_key=None):
+    """Re-render every exported page, e.g. after site settings change the shared layout"""
+    return regenerate_pages(EXPORT_PAGES.keys(), site_key)
+
+@app.cli.command('export-static')
+@click.option('--site', 'site_keys', multiple=True, help='Site key to export (defaults to every site).')
+def export_static_command(site_keys):
+    """Render the public site and sitemap to STATIC_EXPORT_DIR."""
+    # Only STATIC_EXPORT_DIR, never a one-off directory: the live /contact view
+    # relies on the same setting to accept the frozen form's token-less posts
+    if not is_static_export_enabled():
+        raise click.UsageError('Set STATIC_EXPORT_DIR to enable static export.')
+    for site_key in site_keys or registry.keys():
+        site_dir = get_export_dir(site_key)
+        for filename in export_site(site_dir, site_key):
+            click.echo(f"Wrote {os.path.join(site_dir, filename)}")
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The app reads its configuration from the environment at import time, so
+# point it at a throwaway database before anything imports it
+TEST_DIR = tempfile.mkdtemp(prefix='grandstage-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ['SESSION_SECRET'] = 'test-secret'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['ADMIN_REVOCATION_FILE'] = os.path.join(TEST_DIR, 'admin_revoked')
+os.environ.pop('DATABASE_REPLICA_URL', None)
+os.environ.pop('SITES', None)
+os.environ.pop('STATIC_EXPORT_DIR', None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app  # noqa: E402
+
+@pytest.fixture
+def client():
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def admin_client(client):
+    response = client.post('/admin/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
+
+@pytest.fixture
+def export_dir(tmp_path):
+    app.config['STATIC_EXPORT_DIR'] = str(tmp_path / 'site')
+    yield tmp_path / 'site'
+    app.config['STATIC_EXPORT_DIR'] = None
@@ -0,0 +1,37 @@
+import pytest
+from app import app
+from models import Admin
+from auth_utils import SessionAdmin
+
+@pytest.fixture
+def editor():
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['create-admin', 'editor', 'editor@example.com', '--password', 'first-pass'])
+    assert result.exit_code == 0, result.output
+    yield 'editor'
+    runner.invoke(args=['delete-admin', 'editor'])
+
+def test_password_change_signs_out_open_sessions(client, editor):
+    client.post('/admin/login', data={'username': editor, 'password': 'first-pass'})
+    assert client.get('/admin/dashboard').status_code == 200
+
+    result = app.test_cli_runner().invoke(args=['set-admin-password', editor, '--password', 'second-pass'])
+    assert result.exit_code == 0, result.output
+    assert client.get('/admin/dashboard').status_code == 302
+
+def test_deleted_admin_is_signed_out(client, editor):
+    client.post('/admin/login', data={'username': editor, 'password': 'first-pass'})
+    assert client.get('/admin/dashboard').status_code == 200
+
+    result = app.test_cli_runner().invoke(args=['delete-admin', editor])
+    assert result.exit_code == 0, result.output
+    assert client.get('/admin/dashboard').status_code == 302
+
+def test_session_admin_has_admin_attributes(editor):
+    with app.app_context():
+        admin = Admin.query.filter_by(username=editor).first()
+        cached = SessionAdmin(admin.id, admin.username, admin.site_key)
+        assert cached.email == admin.email
+        assert cached.created_at == admin.created_at
+        assert cached.password_hash == admin.password_hash
+        assert cached.get_id() == str(admin.id)
@@ -0,0 +1,44 @@
+import pytest
+from html_utils import render_content_html
+
+@pytest.mark.parametrize('href', [
+    'javascript:alert(1)',
+    'JaVaScRiPt:alert(1)',
+    ' javascript:alert(1)',
+    'jav&#x09;ascript:alert(1)',
+    '&#106;avascript:alert(1)',
+    'java&Tab;script:alert(1)',
+    'data:text/html;base64,PHNjcmlwdD4=',
+])
+def test_unsafe_urls_are_removed(href):
+    html = render_content_html(f'<a href="{href}">x</a><img src="{href}">')
+    assert html == '<a>x</a><img>'
+
+def test_safe_urls_are_kept():
+    html = render_content_html('<a href="/about">a</a><a href="mailto:x@example.com">m</a>')
+    assert html == '<a href="/about">a</a><a href="mailto:x@example.com">m</a>'
+
+def test_event_handler_attributes_are_removed():
+    html = render_content_html('<p onclick="alert(1)" class="lead">hi</p><img src="/x.png" onerror="alert(1)">')
+    assert html == '<p class="lead">hi</p><img src="/x.png">'
+
+def test_dropped_content_tags_lose_their_contents():
+    html = render_content_html('<script>alert(1)</script><style>p{}</style>'
+                               '<iframe src="https://evil.example"></iframe><p>kept</p>')
+    assert html == '<p>kept</p>'
+
+def test_unknown_tags_keep_their_text():
+    assert render_content_html('<p><font color="red">text</font></p>') == '<p>text</p>'
+
+def test_target_gets_noopener():
+    html = render_content_html('<a href="https://example.com" target="_blank" rel="opener">x</a>')
+    assert html == '<a href="https://example.com" target="_blank" rel="noopener noreferrer">x</a>'
+
+def test_pre_is_preserved():
+    source = '<div>\n  <pre>  line one\n      indented</pre>\n</div>'
+    assert render_content_html(source) == '<div><pre>  line one\n      indented</pre></div>'
+
+def test_whitespace_is_collapsed_but_nbsp_kept():
+    assert render_content_html('<p>a   \n b</p>\n\n<p>c</p>') == '<p>a b</p><p>c</p>'
+    assert render_content_html('<p>a&nbsp;&nbsp;b</p>') == '<p>a\xa0\xa0b</p>'
+    assert render_content_html('<p>&nbsp;</p>') == '<p>\xa0</p>'
@@ -0,0 +1,114 @@
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from link_checker import check_urls
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """/missing is 404, /no-head refuses HEAD, /slow/* takes a moment, anything else is 200"""
+
+    def respond(self):
+        server = self.server
+        server.requests.append((self.command, self.path))
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path.startswith('/slow/'):
+                time.sleep(0.2)
+            if self.path == '/missing':
+                status = 404
+            elif self.path == '/no-head' and self.command == 'HEAD':
+                status = 405
+            else:
+                status = 200
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    do_HEAD = respond
+    do_GET = respond
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.requests = []
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+def check(urls, per_host=4):
+    return check_urls(urls, timeout=2, max_workers=8, per_host=per_host, ttl=0)
+
+def test_missing_url_is_broken(stand_in):
+    _, base_url = stand_in
+    results = check([f'{base_url}/missing', f'{base_url}/poster.jpg'])
+    assert results[f'{base_url}/missing'] == ('broken', 'HTTP 404')
+    assert results[f'{base_url}/poster.jpg'] == ('ok', 'HTTP 200')
+
+def test_head_refused_falls_back_to_get(stand_in):
+    server, base_url = stand_in
+    results = check([f'{base_url}/no-head'])
+    assert results[f'{base_url}/no-head'] == ('ok', 'HTTP 200')
+    assert server.requests == [('HEAD', '/no-head'), ('GET', '/no-head')]
+
+def test_per_host_cap_is_respected(stand_in):
+    server, base_url = stand_in
+    urls = [f'{base_url}/slow/{n}' for n in range(8)]
+    results = check(urls, per_host=2)
+    assert all(status == 'ok' for status, _ in results.values())
+    assert server.max_in_flight == 2
+
+def test_refused_connection_is_not_broken():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    status, _ = check([f'http://127.0.0.1:{port}/poster.jpg'])[f'http://127.0.0.1:{port}/poster.jpg']
+    assert status == 'error'
+
+def test_check_media_holds_no_transaction_during_network_io(monkeypatch):
+    import link_checker
+    from app import app, db
+    from models import Image
+
+    seen = []
+    def fake_check_urls(urls, ttl=None):
+        seen.append(db.session().in_transaction())
+        return {url: ('broken', 'HTTP 404') for url in urls}
+    monkeypatch.setattr(link_checker, 'check_urls', fake_check_urls)
+
+    with app.app_context():
+        image = Image(title='Gone', image_url='https://media.example.com/gone.jpg', page_name='gallery')
+        db.session.add(image)
+        db.session.commit()
+        try:
+            summary = link_checker.check_media(force=True, deactivate=True)
+            assert seen == [False]
+            assert summary['deactivated'] == 1
+            assert db.session.get(Image, image.id).is_active is False
+        finally:
+            db.session.delete(db.session.get(Image, image.id))
+            db.session.commit()
+
+def test_check_links_redirects_only_to_manage_pages(admin_client, monkeypatch):
+    import routes
+    monkeypatch.setattr(routes, 'start_media_check', lambda site_key, force=False: True)
+
+    response = admin_client.post('/admin/media/check-links', data={'next': '/admin/videos'},
+                                 headers={'Referer': 'https://evil.example/'})
+    assert response.headers['Location'] == '/admin/videos'
+
+    response = admin_client.post('/admin/media/check-links', data={'next': 'https://evil.example/'},
+                                 headers={'Referer': 'https://evil.example/'})
+    assert response.headers['Location'] == '/admin/images'
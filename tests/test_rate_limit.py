@@ -0,0 +1,39 @@
+import time
+import pytest
+from app import app, db
+from models import RateLimitCounter
+from rate_limit import DatabaseBackend, MemoryBackend, check_rate_limits
+
+@pytest.fixture
+def database_backend():
+    with app.app_context():
+        yield DatabaseBackend(lambda: db.engine)
+        RateLimitCounter.query.delete()
+        db.session.commit()
+
+def test_database_backend_enforces_limit(database_backend):
+    results = [database_backend.hit('test:limit', 3, 3600)[0] for _ in range(5)]
+    assert results == [True, True, True, False, False]
+    assert RateLimitCounter.query.filter_by(key='test:limit').one().count == 3
+
+def test_database_backend_sweeps_abandoned_keys(database_backend):
+    old_start = int(time.time()) - 3 * 86400
+    db.session.add(RateLimitCounter(key='test:gone', window_start=old_start, count=4))
+    db.session.commit()
+
+    database_backend.sweep(time.time())
+    assert RateLimitCounter.query.filter_by(key='test:gone').count() == 0
+
+def test_rejected_request_does_not_spend_later_rules(monkeypatch):
+    backend = MemoryBackend()
+    app.extensions['rate_limit_backend'] = backend
+    monkeypatch.setitem(app.config['RATE_LIMITS'], 'admin_login',
+                        [('ip', '1/minute'), ('form:username', '5/minute')])
+    try:
+        for _ in range(4):
+            with app.test_request_context('/admin/login', method='POST', data={'username': 'victim'}):
+                check_rate_limits('admin_login')
+        victim_hits = [len(timestamps) for key, (timestamps, _) in backend.hits.items() if 'victim' in key]
+        assert victim_hits == [1]
+    finally:
+        app.extensions.pop('rate_limit_backend', None)
@@ -0,0 +1,53 @@
+import pytest
+from app import app, db
+from models import PageRevision
+from revisions import SNAPSHOT_INTERVAL, commit_with_revision, compress_text, get_revision_text, record_revision
+
+@pytest.fixture
+def page_name(request):
+    with app.app_context():
+        yield request.node.name
+        PageRevision.query.filter_by(page_name=request.node.name).delete()
+        db.session.commit()
+
+def make_text(n):
+    lines = [f'<p>Paragraph {i} of version {n if i % 7 == n % 7 else 0}</p>\n' for i in range(30)]
+    if n % 3 == 0:
+        lines.insert(n % 30, f'<h2>Inserted in {n}</h2>')
+    if n % 5 == 0:
+        del lines[(n * 3) % len(lines)]
+    return ''.join(lines)
+
+def test_revisions_round_trip_across_snapshots(page_name):
+    texts = [make_text(n) for n in range(1, 121)]
+    for text in texts:
+        record_revision(page_name, text)
+        db.session.commit()
+
+    rows = PageRevision.query.filter_by(page_name=page_name).order_by(PageRevision.revision_number).all()
+    assert [row.revision_number for row in rows] == list(range(1, 121))
+    assert {row.revision_number for row in rows if row.storage == 'full'} == \
+        {n for n in range(1, 121) if n % SNAPSHOT_INTERVAL == 0} | {120}
+    for number, text in enumerate(texts, start=1):
+        assert get_revision_text(page_name, number) == text
+
+def test_conflicting_revision_number_is_retried(page_name):
+    record_revision(page_name, '<p>first</p>')
+    db.session.commit()
+
+    attempts = []
+    def save():
+        attempts.append(record_revision(page_name, '<p>published</p>'))
+        if len(attempts) == 1:
+            # An autosave from another request lands between our read and our commit
+            with db.engine.begin() as conn:
+                conn.execute(PageRevision.__table__.insert().values(
+                    site_key='default', page_name=page_name, revision_number=2, storage='full',
+                    data=compress_text('<p>autosaved</p>'), content_length=16, is_autosave=True))
+        return attempts[-1]
+
+    revision = commit_with_revision(save)
+    assert len(attempts) == 2
+    assert revision.revision_number == 3
+    assert [get_revision_text(page_name, n) for n in (1, 2, 3)] == \
+        ['<p>first</p>', '<p>autosaved</p>', '<p>published</p>']
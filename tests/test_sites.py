@@ -0,0 +1,94 @@
+import pytest
+from app import app
+from models import Admin, EmailCredentials
+from sites import parse_sites, registry
+
+@pytest.fixture
+def two_sites():
+    registry.configure(parse_sites('{"default": {"hosts": ["a.test"]}, "acme": {"hosts": ["b.test"]}}'))
+    try:
+        with app.app_context():
+            has_admin = Admin.query.filter_by(site_key='acme').count()
+        if not has_admin:
+            result = app.test_cli_runner().invoke(args=['create-admin', '--site', 'acme', 'acme-admin',
+                                                        'admin@acme.example.com', '--password', 'acme-pass'])
+            assert result.exit_code == 0, result.output
+        yield
+    finally:
+        registry.configure(parse_sites(None))
+
+def login(client, host, username, password):
+    return client.post('/admin/login', base_url=f'http://{host}',
+                       data={'username': username, 'password': password})
+
+def test_admin_cannot_sign_in_on_another_site(client, two_sites):
+    assert login(client, 'b.test', 'admin', 'admin123').status_code == 200
+    assert client.get('/admin/dashboard', base_url='http://b.test').status_code == 302
+
+    assert login(client, 'b.test', 'acme-admin', 'acme-pass').status_code == 302
+    assert client.get('/admin/dashboard', base_url='http://b.test').status_code == 200
+
+def test_email_credentials_are_per_site(client, two_sites):
+    login(client, 'a.test', 'admin', 'admin123')
+    response = client.post('/admin/system-credentials', base_url='http://a.test', data={
+        'email_address': 'mailer@site-a.example.com',
+        'app_password': 'secret-a',
+        'smtp_server': 'smtp.a.test',
+        'smtp_port': 587,
+        'from_name': 'Site A',
+    })
+    assert response.status_code == 302
+
+    login(client, 'b.test', 'acme-admin', 'acme-pass')
+    response = client.get('/admin/system-credentials', base_url='http://b.test')
+    assert response.status_code == 200
+    assert b'mailer@site-a.example.com' not in response.data
+    with app.app_context():
+        assert EmailCredentials.query.filter_by(site_key='default').count() == 1
+        assert EmailCredentials.query.filter_by(site_key='acme').count() == 0
+
+def test_link_check_only_touches_current_site(two_sites):
+    from models import Image
+    from app import db
+    from link_checker import check_media
+    with app.app_context():
+        images = [Image(site_key=site_key, title=f'{site_key} poster', image_url='ftp://media.invalid/poster.jpg',
+                        page_name='gallery') for site_key in ('default', 'acme')]
+        db.session.add_all(images)
+        db.session.commit()
+        ids = {image.site_key: image.id for image in images}
+
+        check_media(force=True, deactivate=False, site_key='acme')
+        assert db.session.get(Image, ids['acme']).link_status is not None
+        assert db.session.get(Image, ids['default']).link_status is None
+
+        db.session.delete(db.session.get(Image, ids['default']))
+        db.session.delete(db.session.get(Image, ids['acme']))
+        db.session.commit()
+
+def test_login_rate_limit_is_per_site(two_sites, monkeypatch):
+    from rate_limit import MemoryBackend, check_rate_limits
+    app.extensions['rate_limit_backend'] = MemoryBackend()
+    monkeypatch.setitem(app.config['RATE_LIMITS'], 'admin_login', [('form:username', '2/minute')])
+    try:
+        def attempt(host):
+            with app.test_request_context('/admin/login', method='POST', base_url=f'http://{host}',
+                                          data={'username': 'admin'}):
+                return check_rate_limits('admin_login')
+        assert [attempt('a.test') for _ in range(3)][-1] > 0
+        assert attempt('b.test') == 0
+    finally:
+        app.extensions.pop('rate_limit_backend', None)
+
+def test_readiness_reports_email_for_the_requesting_site(client, two_sites):
+    from app import db
+    import health
+    with app.app_context():
+        if not EmailCredentials.query.filter_by(site_key='default').count():
+            db.session.add(EmailCredentials(site_key='default', email_address='mailer@site-a.example.com',
+                                            app_password='secret-a'))
+            db.session.commit()
+    health._cache.update(result=None, expires=0)
+
+    assert client.get('/readyz', base_url='http://a.test').get_json()['email']['configured'] is True
+    assert client.get('/readyz', base_url='http://b.test').get_json()['email']['configured'] is False
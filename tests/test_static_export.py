@@ -0,0 +1,40 @@
+from flask import url_for
+from app import app
+
+def test_admin_save_does_not_publish_admin_link(admin_client, export_dir):
+    response = admin_client.post('/admin/content/about', data={
+        'page_name': 'about',
+        'content': '<p>Freshly frozen about page</p>',
+    })
+    assert response.status_code == 302
+
+    html = (export_dir / 'about' / 'index.html').read_text(encoding='utf-8')
+    assert 'Freshly frozen about page' in html
+    with app.test_request_context():
+        assert url_for('admin_dashboard') not in html
+
+    # The admin's own session is untouched by the anonymous render
+    response = admin_client.get('/admin/dashboard')
+    assert response.status_code == 200
+
+def test_frozen_contact_form_posts_without_csrf_token(client, export_dir):
+    from models import ContactSubmission
+    app.config['WTF_CSRF_ENABLED'] = True
+    try:
+        result = app.test_cli_runner().invoke(args=['export-static'])
+        assert result.exit_code == 0, result.output
+
+        html = (export_dir / 'contact' / 'index.html').read_text(encoding='utf-8')
+        assert 'csrf_token' not in html
+
+        response = client.post('/contact', data={
+            'name': 'Frozen Visitor',
+            'email': 'visitor@example.com',
+            'subject': 'Tickets',
+            'message': 'Sent from the static contact page.',
+        })
+        assert response.status_code == 302
+        with app.app_context():
+            assert ContactSubmission.query.filter_by(name='Frozen Visitor').count() == 1
+    finally:
+        app.config['WTF_CSRF_ENABLED'] = False